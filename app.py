@@ -1,25 +1,32 @@
-from flask import Flask, request, jsonify, g
+from flask import Flask, Response, request, jsonify, g, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
 import logging
 import json
 import time
-import uuid
+import queue
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from cachetools import TTLCache
 import random
+from types import SimpleNamespace
 from typing import Any, Optional, Tuple
-from werkzeug.utils import secure_filename
 import re
-from copy import deepcopy
+import hashlib
+import mmap
+
+# RAG components are imported lazily (see _rag_modules / _get_* helpers) so
+# FAISS and torch load on first use rather than at boot
+from rag.fastuuid import new_request_id
 
-# RAG components (import lazily inside routes where heavy)
 try:
-    from rag.config import RAGConfig  # lightweight
-    from rag.vector_store import VectorStore  # initializes FAISS, lazy-loads model
-except Exception as _e:
-    # Defer errors until endpoints are called; keep server boot light
-    RAGConfig = None  # type: ignore
-    VectorStore = None  # type: ignore
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,112 +34,221 @@ load_dotenv()
 APP_VERSION = "0.1.0"
 
 
+# Canned stub responses, grouped by intent
+_GREETING_RESPONSES = (
+    "Hello! I'm your AI assistant. How can I help you today?",
+    "Hi there! What would you like to know?",
+    "Hey! I'm here to help. What's on your mind?",
+    "Greetings! Feel free to ask me anything.",
+    "Hello! I'm ready to assist you with your questions."
+)
+_HOW_ARE_YOU_RESPONSES = (
+    "I'm doing great! Thanks for asking. How can I assist you?",
+    "I'm functioning perfectly and ready to help!",
+    "All systems operational! What can I do for you?",
+    "I'm excellent, thank you! How may I help you today?"
+)
+_CAPABILITIES_RESPONSES = (
+    "I'm a RAG-powered chatbot! I can answer questions, have conversations, and help with various topics. What would you like to explore?",
+    "I can help you with questions, provide information, and have meaningful conversations. Try asking me about any topic!",
+    "I'm here to assist with answering questions and providing helpful information. What would you like to know?",
+    "I can engage in conversations, answer questions, and provide assistance on various topics. How can I help you today?"
+)
+_GOODBYE_RESPONSES = (
+    "Goodbye! It was nice chatting with you. Come back anytime!",
+    "See you later! Feel free to return whenever you have questions.",
+    "Farewell! Thanks for the conversation. Have a great day!",
+    "Bye! Hope I was helpful. Until next time!"
+)
+_THANKS_RESPONSES = (
+    "You're very welcome! Happy to help anytime.",
+    "My pleasure! Let me know if you need anything else.",
+    "Glad I could help! Feel free to ask more questions.",
+    "You're welcome! I'm here whenever you need assistance."
+)
+_IDENTITY_RESPONSES = (
+    "I'm your RAG-powered AI assistant! You can call me whatever you'd like.",
+    "I'm an AI chatbot designed to help answer your questions. What should I call you?",
+    "I'm your helpful AI assistant. I don't have a specific name yet - got any suggestions?",
+    "I'm an AI assistant here to help you. What would you like to know?"
+)
+_TEST_RESPONSES = (
+    "Test successful! I'm working perfectly and ready to chat.",
+    "Testing complete! Everything looks good. What's your real question?",
+    "System check passed! I'm functioning normally. How can I help?",
+    "Test confirmed! I'm online and ready to assist you."
+)
+# Default templates for unrecognized questions (formatted with the question)
+_DEFAULT_RESPONSES = (
+    "That's an interesting question about '{question}'. I'm still learning! Can you tell me more?",
+    "I see you're asking about '{question}'. While I'm still developing my knowledge base, I'd love to learn more about this topic from you!",
+    "'{question}' is a great question! I'm currently a basic chatbot, but I'm being enhanced with RAG capabilities. What specifically would you like to know?",
+    "Thanks for asking about '{question}'! I'm in development mode right now. Can you provide more context so I can better assist you?",
+    "Interesting topic: '{question}'. I'm learning every day! What aspect interests you most?"
+)
+
+# Intent dispatch table, checked in order; one compiled alternation per intent
+_INTENTS = (
+    (re.compile(r"\b(?:hello|hi|hey|greetings)\b"), _GREETING_RESPONSES),
+    (re.compile(r"\b(?:how are you|how do you do|how's it going)\b"), _HOW_ARE_YOU_RESPONSES),
+    (re.compile(r"\b(?:what can you do|what do you do|help me|capabilities)\b"), _CAPABILITIES_RESPONSES),
+    (re.compile(r"\b(?:bye|goodbye|see you|farewell|exit)\b"), _GOODBYE_RESPONSES),
+    (re.compile(r"\b(?:thank you|thanks|appreciate|grateful)\b"), _THANKS_RESPONSES),
+    (re.compile(r"\b(?:what is your name|who are you|your name)\b"), _IDENTITY_RESPONSES),
+    (re.compile(r"\b(?:test|testing|check)\b"), _TEST_RESPONSES),
+)
+
+
+# Small-talk intents answered before the RAG pipeline is touched, and the words
+# allowed around them ("thanks so much", "hi there"). Anything else falls
+# through so e.g. "hi, what is a seminar?" still reaches retrieval.
+_SMALL_TALK_INTENTS = tuple(
+    intent for intent in _INTENTS
+    if intent[1] in (_GREETING_RESPONSES, _HOW_ARE_YOU_RESPONSES, _GOODBYE_RESPONSES,
+                     _THANKS_RESPONSES, _IDENTITY_RESPONSES)
+)
+_SMALL_TALK_FILLER = frozenset([
+    "there", "so", "much", "very", "a", "lot", "again", "all", "everyone",
+    "for", "the", "your", "help", "you", "and", "today", "bot", "ok", "okay",
+])
+_WORD_RE = re.compile(r"[a-z']+")
+
+# Per-thread RNG so request threads don't share the random module's global instance
+_rng_local = threading.local()
+
+
+def _rand() -> random.Random:
+    rng = getattr(_rng_local, "rng", None)
+    if rng is None:
+        rng = _rng_local.rng = random.Random()
+    return rng
+
+
 def generate_response(question):
     """Generate a smart response based on the question."""
     question_lower = question.lower().strip()
-    
-    # Greeting responses
-    if any(word in question_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-        responses = [
-            "Hello! I'm your AI assistant. How can I help you today?",
-            "Hi there! What would you like to know?",
-            "Hey! I'm here to help. What's on your mind?",
-            "Greetings! Feel free to ask me anything.",
-            "Hello! I'm ready to assist you with your questions."
-        ]
-        return random.choice(responses)
-    
-    # How are you responses
-    elif any(phrase in question_lower for phrase in ['how are you', 'how do you do', 'how\'s it going']):
-        responses = [
-            "I'm doing great! Thanks for asking. How can I assist you?",
-            "I'm functioning perfectly and ready to help!",
-            "All systems operational! What can I do for you?",
-            "I'm excellent, thank you! How may I help you today?"
-        ]
-        return random.choice(responses)
-    
-    # What can you do responses
-    elif any(phrase in question_lower for phrase in ['what can you do', 'what do you do', 'help me', 'capabilities']):
-        responses = [
-            "I'm a RAG-powered chatbot! I can answer questions, have conversations, and help with various topics. What would you like to explore?",
-            "I can help you with questions, provide information, and have meaningful conversations. Try asking me about any topic!",
-            "I'm here to assist with answering questions and providing helpful information. What would you like to know?",
-            "I can engage in conversations, answer questions, and provide assistance on various topics. How can I help you today?"
-        ]
-        return random.choice(responses)
-    
-    # Goodbye responses
-    elif any(word in question_lower for word in ['bye', 'goodbye', 'see you', 'farewell', 'exit']):
-        responses = [
-            "Goodbye! It was nice chatting with you. Come back anytime!",
-            "See you later! Feel free to return whenever you have questions.",
-            "Farewell! Thanks for the conversation. Have a great day!",
-            "Bye! Hope I was helpful. Until next time!"
-        ]
-        return random.choice(responses)
-    
-    # Thank you responses
-    elif any(phrase in question_lower for phrase in ['thank you', 'thanks', 'appreciate', 'grateful']):
-        responses = [
-            "You're very welcome! Happy to help anytime.",
-            "My pleasure! Let me know if you need anything else.",
-            "Glad I could help! Feel free to ask more questions.",
-            "You're welcome! I'm here whenever you need assistance."
-        ]
-        return random.choice(responses)
-    
-    # Name/identity questions
-    elif any(phrase in question_lower for phrase in ['what is your name', 'who are you', 'your name']):
-        responses = [
-            "I'm your RAG-powered AI assistant! You can call me whatever you'd like.",
-            "I'm an AI chatbot designed to help answer your questions. What should I call you?",
-            "I'm your helpful AI assistant. I don't have a specific name yet - got any suggestions?",
-            "I'm an AI assistant here to help you. What would you like to know?"
-        ]
-        return random.choice(responses)
-    
-    # Test responses
-    elif any(word in question_lower for word in ['test', 'testing', 'check']):
-        responses = [
-            "Test successful! I'm working perfectly and ready to chat.",
-            "Testing complete! Everything looks good. What's your real question?",
-            "System check passed! I'm functioning normally. How can I help?",
-            "Test confirmed! I'm online and ready to assist you."
-        ]
-        return random.choice(responses)
-    
+
+    for pattern, responses in _INTENTS:
+        if pattern.search(question_lower):
+            return _rand().choice(responses)
+
     # Default response for unrecognized questions
-    else:
-        responses = [
-            f"That's an interesting question about '{question}'. I'm still learning! Can you tell me more?",
-            f"I see you're asking about '{question}'. While I'm still developing my knowledge base, I'd love to learn more about this topic from you!",
-            f"'{question}' is a great question! I'm currently a basic chatbot, but I'm being enhanced with RAG capabilities. What specifically would you like to know?",
-            f"Thanks for asking about '{question}'! I'm in development mode right now. Can you provide more context so I can better assist you?",
-            f"Interesting topic: '{question}'. I'm learning every day! What aspect interests you most?"
-        ]
-        return random.choice(responses)
+    return _rand().choice(_DEFAULT_RESPONSES).format(question=question)
+
+def _match_canned_intent(question: str) -> Optional[str]:
+    """Return a canned reply if the question is pure small talk, else None."""
+    question_lower = question.lower().strip()
+    responses = None
+    rest = question_lower
+    for pattern, intent_responses in _SMALL_TALK_INTENTS:
+        if pattern.search(rest):
+            if responses is None:
+                responses = intent_responses
+            rest = pattern.sub(" ", rest)
+    if responses is None:
+        return None
+    if any(word not in _SMALL_TALK_FILLER for word in _WORD_RE.findall(rest)):
+        return None
+    return _rand().choice(responses)
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def _sse_response(events) -> Response:
+    """Send ResponseGenerator.stream_response events as server-sent events.
+
+    Each event is one ``data:`` JSON line; the final one is tagged ``event: done``.
+    """
+    def body():
+        for event in events:
+            prefix = "event: done\ndata: " if event.get("done") else "data: "
+            yield prefix + _json_dumps(event) + "\n\n"
+
+    response = Response(stream_with_context(body()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson when installed."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if not ORJSON_AVAILABLE:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        # orjson takes no decoder hooks; defer to stdlib if any are passed
+        if not ORJSON_AVAILABLE or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configure logging (basic for now; can be expanded with handlers/formatters)
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=log_level)
 logger = logging.getLogger("backend")
 
+# Access log records are serialized and written by a background thread so the
+# request thread only pays for building the dict. When the queue is full,
+# records are dropped rather than blocking responses.
+_LOG_QUEUE: "queue.Queue[dict]" = queue.Queue(maxsize=int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000")))
+
+
+def _write_access_record(record: dict) -> None:
+    try:
+        logger.info(_json_dumps(record))
+    except Exception:
+        logger.exception("failed to log request")
+
+
+def _access_log_worker() -> None:
+    while True:
+        _write_access_record(_LOG_QUEUE.get())
+
+
+@atexit.register
+def _drain_access_log() -> None:
+    """Flush records still queued when the interpreter exits."""
+    while True:
+        try:
+            record = _LOG_QUEUE.get_nowait()
+        except queue.Empty:
+            return
+        _write_access_record(record)
+
+
+threading.Thread(target=_access_log_worker, name="access-log", daemon=True).start()
+
 
 @app.before_request
 def _start_timer_and_request_id():
-    g._start_time = time.time()
-    g.request_id = str(uuid.uuid4())
+    g._start_ns = time.time_ns()
+    g.request_id = new_request_id()
 
 
 @app.after_request
 def _log_request(response):
     try:
-        duration = int((time.time() - getattr(g, '_start_time', time.time())) * 1000)
+        now_ns = time.time_ns()
+        duration = (now_ns - getattr(g, '_start_ns', now_ns)) // 1_000_000
         record = {
-            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime()) + f".{int((time.time()%1)*1000):03d}Z",
+            "ts": now_ns // 1_000_000,  # epoch milliseconds (UTC)
             "level": "INFO",
             "request_id": getattr(g, 'request_id', None),
             "method": request.method,
@@ -140,11 +256,14 @@ def _log_request(response):
             "status": response.status_code,
             "latency_ms": duration,
             "remote_addr": request.remote_addr,
-            "content_length": response.calculate_content_length(),
+            # Header only; never touch the body of streamed/file responses
+            "content_length": response.content_length,
             "user_agent": request.headers.get('User-Agent', '')[:200],
             "message": "request"
         }
-        logger.info(json.dumps(record))
+        _LOG_QUEUE.put_nowait(record)
+    except queue.Full:
+        pass
     except Exception:
         logger.exception("failed to log request")
     return response
@@ -162,13 +281,16 @@ def _check_api_key_only() -> Optional[Tuple[Any, int]]:
         return jsonify({"error": "Unauthorized", "code": "API_KEY_INVALID"}), 401
     return None
 
+# Fixed window keeps one counter per client (moving-window stores every hit)
 limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=[],  # all explicit
     storage_uri=os.getenv("RATE_LIMIT_STORAGE_URI", "memory://"),
+    strategy=os.getenv("RATE_LIMIT_STRATEGY", "fixed-window"),
 )
 
+
 def _dynamic_limit(env_name: str, default: int) -> str:
     try:
         v = int(os.getenv(env_name, str(default)) or default)
@@ -182,39 +304,268 @@ ASK_LIMIT = _dynamic_limit("RATE_LIMIT_ASK_PER_MIN", 60)
 UPLOAD_LIMIT = _dynamic_limit("RATE_LIMIT_UPLOAD_PER_MIN", 10)
 DELETE_LIMIT = _dynamic_limit("RATE_LIMIT_DELETE_PER_MIN", 30)
 
+# Shared RAG components, built lazily on first use and reused across requests.
+# Retriever and uploads share one VectorStore so new vectors are searchable
+# immediately without reloading the index from disk.
+_RAG = {
+    "cfg": None, "retriever": None, "responder": None, "processor": None,
+    "processed_dir": None,
+}
+_RAG_LOCK = threading.RLock()
+
+
+_RAG_MODULES: Optional[SimpleNamespace] = None
+
+
+def _rag_modules() -> Optional[SimpleNamespace]:
+    """Import the RAG pipeline classes; None if they can't be imported.
+
+    Success is kept for the process. A failure is not, so the next call
+    retries (e.g. once a missing dependency has been installed).
+    """
+    global _RAG_MODULES
+    if _RAG_MODULES is None:
+        try:
+            from rag.chunking import TextChunker
+            from rag.config import RAGConfig
+            from rag.document_processor import DocumentProcessor
+            from rag.retrieval import RetrieverEngine
+            from rag.response_generator import ResponseGenerator
+        except Exception:
+            logger.exception("RAG pipeline could not be imported")
+            return None
+        _RAG_MODULES = SimpleNamespace(
+            TextChunker=TextChunker, RAGConfig=RAGConfig, DocumentProcessor=DocumentProcessor,
+            RetrieverEngine=RetrieverEngine, ResponseGenerator=ResponseGenerator,
+        )
+    return _RAG_MODULES
+
+
+def _require_rag_modules() -> SimpleNamespace:
+    rag = _rag_modules()
+    if rag is None:
+        raise RuntimeError("RAG pipeline is unavailable; see the server log for the import error")
+    return rag
+
+
+def _get_rag_component(name: str, factory):
+    component = _RAG[name]
+    if component is None:
+        with _RAG_LOCK:
+            component = _RAG[name]
+            if component is None:
+                component = _RAG[name] = factory()
+    return component
+
+
+def _get_cfg():
+    return _get_rag_component("cfg", lambda: _require_rag_modules().RAGConfig.from_env())
+
+
+def _get_retriever():
+    retriever = _get_rag_component("retriever", lambda: _require_rag_modules().RetrieverEngine(_get_cfg()))
+    # Other server workers may have saved uploads or deletes since
+    retriever.vector_store.refresh()
+    return retriever
+
+
+def _get_vs():
+    return _get_retriever().vector_store
+
+
+def _get_responder():
+    return _get_rag_component("responder", lambda: _require_rag_modules().ResponseGenerator(_get_cfg()))
+
+
+def _get_processor():
+    return _get_rag_component("processor", lambda: _require_rag_modules().DocumentProcessor(_get_cfg()))
+
+
+def _get_processed_dir() -> str:
+    return _get_rag_component(
+        "processed_dir",
+        lambda: getattr(_get_cfg(), "processed_folder", None) or os.path.join("documents", "processed"),
+    )
+
+
+# Per-document path; the folder is fixed for the process, so skip os.path.join
+def _processed_path(document_id: str) -> str:
+    return f"{_get_processed_dir()}{os.sep}{document_id}.txt"
+
+
+# Processed-file index: document_id -> (path, mtime_ns, size). Built by one
+# scandir pass and kept current by /upload and DELETE, so the /ask fallbacks
+# don't list and stat the processed folder on every question. Rescanned when
+# the folder's mtime changes, i.e. when any worker adds or removes a file.
+_DOC_INDEX: dict = {}
+_DOC_INDEX_LOCK = threading.Lock()
+_doc_index_dir_mtime: Optional[int] = None
+
+
+def _processed_files(processed_dir: str) -> dict:
+    """Return a snapshot of the processed-file index, rescanning if the folder changed."""
+    global _doc_index_dir_mtime
+    try:
+        dir_mtime = os.stat(processed_dir).st_mtime_ns
+    except FileNotFoundError:
+        dir_mtime = None
+    with _DOC_INDEX_LOCK:
+        if dir_mtime is None or dir_mtime != _doc_index_dir_mtime:
+            _DOC_INDEX.clear()
+            try:
+                with os.scandir(processed_dir) as it:
+                    for entry in it:
+                        if entry.name.endswith(".txt") and entry.is_file():
+                            st = entry.stat()
+                            _DOC_INDEX[entry.name[:-4]] = (entry.path, st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                pass
+            _doc_index_dir_mtime = dir_mtime
+        return dict(_DOC_INDEX)
+
+
+def _doc_index_add(document_id: str, path: str) -> None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return
+    with _DOC_INDEX_LOCK:
+        _DOC_INDEX[document_id] = (path, st.st_mtime_ns, st.st_size)
+
+
+def _doc_index_remove(document_id: str) -> None:
+    with _DOC_INDEX_LOCK:
+        _DOC_INDEX.pop(document_id, None)
+
+
+# Serialized /documents listing, rebuilt on the first request after an upload
+# or delete. The version guards against caching a listing that was built while
+# an invalidation happened; the metadata db's data_version catches changes
+# committed by other worker processes.
+_DOCS_CACHE: Optional[list] = None
+_DOCS_CACHE_ETAG: Optional[str] = None
+_DOCS_CACHE_DB_VERSION: Optional[int] = None
+_DOCS_CACHE_VERSION = 0
+_DOCS_CACHE_LOCK = threading.Lock()
+
+
+def _invalidate_docs_cache() -> None:
+    global _DOCS_CACHE, _DOCS_CACHE_ETAG, _DOCS_CACHE_DB_VERSION, _DOCS_CACHE_VERSION
+    with _DOCS_CACHE_LOCK:
+        _DOCS_CACHE = None
+        _DOCS_CACHE_ETAG = None
+        _DOCS_CACHE_DB_VERSION = None
+        _DOCS_CACHE_VERSION += 1
+
+
+def _not_modified(etag: str):
+    """Return a bodyless 304 if the request's If-None-Match matches etag."""
+    if not request.if_none_match.contains(etag):
+        return None
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+# Contact-info fallback patterns, matched against mmapped processed files
+_EMAIL_RE = re.compile(rb"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_PHONE_RE = re.compile(rb"(?:\+?\d{1,3}[ -]?)?(?:\(\d{2,4}\)[ -]?|\d{2,4}[ -])?\d{3,4}[ -]?\d{3,4}")
+
+# Keyword fallback for /ask when retrieval finds nothing
+_KEYWORD_STOPWORDS = frozenset([
+    "the", "is", "are", "a", "an", "and", "or", "of", "to", "in", "for", "with",
+    "what", "which", "who", "does", "do", "list", "show", "tell", "about",
+    "email", "phone", "contact",
+])
+_KEYWORD_TERM_RE = re.compile(r"[A-Za-z0-9#.+-]+")
+
+
+def _keyword_matches(fpaths, terms):
+    """Return (score, path, line_no, line) for lines containing any term.
+
+    Each file is mmapped and searched once with a compiled alternation of the
+    terms; only lines with a hit are decoded and scored in Python.
+    """
+    if not terms:
+        return []
+    pattern = re.compile(
+        b"|".join(re.escape(t.encode("utf-8")) for t in set(terms)), re.IGNORECASE
+    )
+    matches = []
+    for fpath in fpaths:
+        try:
+            with open(fpath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                line_no, pos = 1, 0
+                last_line_start = -1
+                for m in pattern.finditer(mm):
+                    start = mm.rfind(b"\n", 0, m.start()) + 1
+                    if start == last_line_start:
+                        continue
+                    line_no += mm[pos:start].count(b"\n")
+                    pos = start
+                    last_line_start = start
+                    end = mm.find(b"\n", m.end())
+                    if end == -1:
+                        end = len(mm)
+                    l = mm[start:end].decode("utf-8", errors="ignore").strip()
+                    low = l.lower()
+                    score = sum(1 for term in terms if term and term in low)
+                    if score:
+                        matches.append((score, fpath, line_no, l))
+        except Exception:
+            continue
+    return matches
+
+
 # Active document state (in-memory; per-session tracking would need Redis/DB)
-_active_document_store = {}  # Maps session/IP to active document_id
+# Bounded and expiring so rotating client IPs can't grow it without limit.
+# TTLCache is not thread-safe; all access goes through the lock.
+_active_document_store = TTLCache(
+    maxsize=int(os.getenv("ACTIVE_DOC_CACHE_MAX", "10000")),
+    ttl=int(os.getenv("ACTIVE_DOC_TTL_S", "3600")),
+)  # Maps session/IP to active document_id
+_active_document_lock = threading.Lock()
 
 # Restrict CORS origins in production by replacing '*' with your frontend URL
-CORS(app, resources={r"/*": {"origins": os.getenv("FRONTEND_ORIGIN", "*")}})
+# automatic_options answers preflights before any route (and its RAG imports) runs
+CORS(
+    app,
+    resources={r"/*": {"origins": os.getenv("FRONTEND_ORIGIN", "*")}},
+    automatic_options=True,
+)
+
+
+# /health and / return fixed payloads; serialize them once instead of per request
+_HEALTH_BODY = _json_dumps({
+    "status": "ok",
+    "version": APP_VERSION
+}).encode()
+_INDEX_BODY = _json_dumps({
+    "name": "basic-rag-chatbot-backend",
+    "version": APP_VERSION,
+    "endpoints": [
+        "/health",
+        "/ask",
+        "/active-document",
+        "/rag/warmup",
+        "/upload",
+        "/documents",
+        "/documents/<document_id>",
+        "/rag/stats",
+    ],
+    "message": "Backend operational"
+}).encode()
 
 
 @app.route("/health", methods=["GET"])
 def health():
     """Liveness & readiness probe."""
-    return jsonify({
-        "status": "ok",
-        "version": APP_VERSION
-    }), 200
+    return Response(_HEALTH_BODY, status=200, mimetype="application/json")
 
 
 @app.route("/", methods=["GET"])
 def index():
-    return jsonify({
-        "name": "basic-rag-chatbot-backend",
-        "version": APP_VERSION,
-        "endpoints": [
-            "/health",
-            "/ask",
-            "/active-document",
-            "/rag/warmup",
-            "/upload",
-            "/documents",
-            "/documents/<document_id>",
-            "/rag/stats",
-        ],
-        "message": "Backend operational"
-    }), 200
+    return Response(_INDEX_BODY, status=200, mimetype="application/json")
 
 @app.route("/active-document", methods=["POST"])
 def set_active_document():
@@ -241,11 +592,13 @@ def set_active_document():
     
     if document_id is None:
         # Clear active document
-        _active_document_store.pop(session_key, None)
+        with _active_document_lock:
+            _active_document_store.pop(session_key, None)
         return jsonify({"message": "Active document cleared"}), 200
     else:
         # Set active document
-        _active_document_store[session_key] = document_id
+        with _active_document_lock:
+            _active_document_store[session_key] = document_id
         return jsonify({
             "message": "Active document set",
             "document_id": document_id
@@ -260,7 +613,8 @@ def get_active_document():
         200: {"document_id": "doc_abc123" | null}
     """
     session_key = request.remote_addr or "default"
-    document_id = _active_document_store.get(session_key)
+    with _active_document_lock:
+        document_id = _active_document_store.get(session_key)
     return jsonify({"document_id": document_id}), 200
 
 @app.route("/ask", methods=["POST"])
@@ -270,8 +624,13 @@ def ask():
 
     Expected JSON body:
     {
-        "question": "<string>"
+        "question": "<string>",
+        "stream": false
     }
+
+    With ``"stream": true`` and retrieved sources, the answer is sent as
+    server-sent events while the LLM generates it. Requests without sources
+    stay buffered because the keyword fallbacks need the finished answer.
     """
     # API key enforcement (if configured)
     unauthorized = _check_api_key_only()
@@ -289,24 +648,25 @@ def ask():
     # Auto-resolve active document if not explicitly provided
     if not document_id:
         session_key = request.remote_addr or "default"
-        document_id = _active_document_store.get(session_key)
+        with _active_document_lock:
+            document_id = _active_document_store.get(session_key)
 
     if not question:
         return jsonify({"error": "'question' is required and cannot be empty"}), 400
 
-    # If vector store has data, use RAG pipeline; otherwise use smart stub
-    try:
-        from rag.config import RAGConfig
-        from rag.retrieval import RetrieverEngine
-        from rag.response_generator import ResponseGenerator
-    except Exception:
-        RAGConfig = None  # type: ignore
-        RetrieverEngine = None  # type: ignore
-        ResponseGenerator = None  # type: ignore
+    # Small talk never needs retrieval; answer it without touching the RAG stack
+    canned = _match_canned_intent(question)
+    if canned is not None:
+        return jsonify({
+            "answer": canned,
+            "sources": [],
+            "meta": {"model": "stub-fast", "latency_ms": 0, "source_count": 0}
+        }), 200
 
-    if RAGConfig and RetrieverEngine and ResponseGenerator:
-        cfg = RAGConfig.from_env()
-        retriever = RetrieverEngine(cfg)
+    # If vector store has data, use RAG pipeline; otherwise use smart stub
+    if _rag_modules() is not None:
+        cfg = _get_cfg()
+        retriever = _get_retriever()
         stats = retriever.get_stats()
         total_vectors = stats.get("vector_store_stats", {}).get("total_vectors", 0)
 
@@ -317,18 +677,17 @@ def ask():
 
             # If nothing found, try a second pass with looser settings
             if (not context or not sources):
-                cfg2 = deepcopy(cfg)
-                try:
-                    cfg2.similarity_threshold = 0.3
-                    cfg2.top_k_results = max(8, getattr(cfg, "top_k_results", 5))
-                except Exception:
-                    pass
-                retriever2 = RetrieverEngine(cfg2)
-                retrieval2 = retriever2.retrieve(question, None, document_id=document_id)
+                retrieval2 = retriever.retrieve(
+                    question, None, document_id=document_id,
+                    similarity_threshold=0.3,
+                    top_k_results=max(8, getattr(cfg, "top_k_results", 5)),
+                )
                 if retrieval2.get("sources"):
                     context = retrieval2.get("context", context)
                     sources = retrieval2.get("sources", sources)
-            responder = ResponseGenerator(cfg)
+            responder = _get_responder()
+            if data.get("stream") is True and sources:
+                return _sse_response(responder.stream_response(question, context, sources))
             resp = responder.generate_response(question, context, sources)
             # Align response shape
             answer_text = resp.get("answer", "")
@@ -342,20 +701,16 @@ def ask():
                 src_files = []
                 try:
                     # Scan processed text files for contact info
-                    processed_dir = getattr(cfg, "processed_folder", None) or os.path.join("documents", "processed")
-                    if os.path.isdir(processed_dir):
-                        for fname in os.listdir(processed_dir):
-                            if fname.endswith(".txt"):
-                                fpath = os.path.join(processed_dir, fname)
-                                try:
-                                    with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                                        txt = f.read()
-                                    # Simple regex for emails and phone numbers
-                                    emails.update(re.findall(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}", txt))
-                                    phones.update(re.findall(r"(?:\\+?\\d{1,3}[ -]?)?(?:\\(\\d{2,4}\\)[ -]?|\\d{2,4}[ -])?\\d{3,4}[ -]?\\d{3,4}", txt))
-                                    src_files.append(fpath)
-                                except Exception:
-                                    continue
+                    processed_dir = _get_processed_dir()
+                    for fpath, _, size in _processed_files(processed_dir).values():
+                        try:
+                            if size:
+                                with open(fpath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                                    emails.update(m.decode("ascii") for m in _EMAIL_RE.findall(mm))
+                                    phones.update(m.decode("ascii") for m in _PHONE_RE.findall(mm))
+                            src_files.append(fpath)
+                        except Exception:
+                            continue
                     if emails or phones:
                         lines = []
                         if emails:
@@ -382,31 +737,18 @@ def ask():
             # Generic keyword fallback: scan processed text for lines matching query terms
             if (not answer_text or not resp_sources) and total_vectors:
                 try:
-                    processed_dir = getattr(cfg, "processed_folder", None) or os.path.join("documents", "processed")
-                    if os.path.isdir(processed_dir):
+                    processed_dir = _get_processed_dir()
+                    files = _processed_files(processed_dir)
+                    if files:
                         # Basic keyword extraction from question
-                        stop = set(["the","is","are","a","an","and","or","of","to","in","for","with","what","which","who","does","do","list","show","tell","about","email","phone","contact"])
-                        terms = [t.lower() for t in re.findall(r"[A-Za-z0-9#.+-]+", ql) if t.lower() not in stop]
-                        matches = []
+                        terms = [t.lower() for t in _KEYWORD_TERM_RE.findall(ql) if t.lower() not in _KEYWORD_STOPWORDS]
                         # Only scan specified document if document_id is present
                         if document_id:
-                            fpaths = [os.path.join(processed_dir, f"{document_id}.txt")]
+                            entries = [files[document_id]] if document_id in files else []
                         else:
-                            fpaths = [os.path.join(processed_dir, fname) for fname in os.listdir(processed_dir) if fname.endswith(".txt")]
-                        for fpath in fpaths:
-                            if not os.path.isfile(fpath):
-                                continue
-                            try:
-                                with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                                    for i, line in enumerate(f):
-                                        l = line.strip()
-                                        if not l:
-                                            continue
-                                        score = sum(1 for term in terms if term and term in l.lower())
-                                        if score:
-                                            matches.append((score, fpath, i+1, l))
-                            except Exception:
-                                continue
+                            entries = files.values()
+                        fpaths = [path for path, _, size in entries if size]
+                        matches = _keyword_matches(fpaths, terms)
                         if matches:
                             # Take top by score
                             matches.sort(key=lambda x: (-x[0], x[1], x[2]))
@@ -449,13 +791,9 @@ def rag_warmup():
     Does not modify any state; just tests that embeddings can be generated.
     """
     try:
-        # Lazy import to avoid torch import on app startup
-        from rag.config import RAGConfig
-        from rag.vector_store import VectorStore
-
-        cfg = RAGConfig.from_env()
+        cfg = _get_cfg()
         cfg.validate()
-        vs = VectorStore(cfg)
+        vs = _get_vs()
         # Tiny smoke test: generate one embedding
         _ = vs.generate_embeddings(["warmup test"])  # noqa: F841
 
@@ -473,10 +811,93 @@ def rag_warmup():
         }), 500
 
 
+# Opt-in background indexing: /upload returns 202 once the text is extracted and
+# chunking/embedding run on a small pool. Progress is visible as the document's
+# status in /documents ("indexing", then "processed" or "failed").
+UPLOAD_ASYNC = os.getenv("UPLOAD_ASYNC", "false").lower() == "true"
+_upload_pool: Optional[ThreadPoolExecutor] = None
+_INDEX_JOBS: dict = {}  # document_id -> {"status": ..., "error": ...} while not done
+_INDEX_JOBS_LOCK = threading.Lock()
+# Held while a document is indexed or deleted, so a DELETE that arrives during
+# background embedding waits for it instead of leaving orphan vectors. Striped
+# by id rather than one lock per document, so nothing needs cleaning up.
+_DOC_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+
+def _doc_lock(document_id: str) -> threading.Lock:
+    return _DOC_LOCKS[hash(document_id) % len(_DOC_LOCKS)]
+
+
+def _get_upload_pool() -> ThreadPoolExecutor:
+    global _upload_pool
+    if _upload_pool is None:
+        with _INDEX_JOBS_LOCK:
+            if _upload_pool is None:
+                _upload_pool = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("UPLOAD_WORKERS", "2")),
+                    thread_name_prefix="upload-index",
+                )
+    return _upload_pool
+
+
+def _set_index_job(document_id: str, status: Optional[str], error: Optional[str] = None) -> None:
+    with _INDEX_JOBS_LOCK:
+        if status is None:
+            _INDEX_JOBS.pop(document_id, None)
+        else:
+            _INDEX_JOBS[document_id] = {"status": status, "error": error}
+    _invalidate_docs_cache()
+
+
+def _index_document(doc_id: str) -> int:
+    """Chunk and embed a processed document into the vector store; returns chunk count."""
+    with open(_processed_path(doc_id), "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+
+    # Chunk and index
+    chunker = _require_rag_modules().TextChunker(_get_cfg())
+    chunks = chunker.chunk_text(text, doc_id)
+    _get_vs().add_documents(chunks)
+
+    # Update document metadata chunk count (and clear a "failed" from an earlier attempt)
+    try:
+        _get_processor().update_metadata(doc_id, chunk_count=len(chunks), status="processed")
+    except Exception:
+        logger.exception("Failed to update chunk_count for %s", doc_id)
+    # chunk_count changed
+    _invalidate_docs_cache()
+    return len(chunks)
+
+
+def _run_index_job(doc_id: str) -> None:
+    with _doc_lock(doc_id):
+        processor = _get_processor()
+        if processor.get_document_metadata(doc_id) is None:
+            # Deleted before the job started
+            _set_index_job(doc_id, None)
+            return
+        try:
+            _index_document(doc_id)
+        except Exception as e:
+            logger.exception("Background indexing failed for %s", doc_id)
+            # Persisted, so the failure outlives this process and shows in other workers
+            try:
+                processor.update_metadata(doc_id, status="failed")
+            except Exception:
+                logger.exception("Failed to record failed status for %s", doc_id)
+            _set_index_job(doc_id, "failed", str(e))
+            return
+        _set_index_job(doc_id, None)
+
+
 @app.route("/upload", methods=["POST"])
 @limiter.limit(UPLOAD_LIMIT)
 def upload_document():
-    """Upload a document, extract text, chunk, and index into vector store."""
+    """Upload a document, extract text, chunk, and index into vector store.
+
+    Returns 201 once indexed, or 202 with status "indexing" when UPLOAD_ASYNC
+    is enabled and indexing continues in the background.
+    """
     try:
         unauthorized = _check_api_key_only()
         if unauthorized:
@@ -488,46 +909,32 @@ def upload_document():
         if file.filename == "":
             return jsonify({"error": "No selected file"}), 400
 
-        from rag.config import RAGConfig
-        from rag.document_processor import DocumentProcessor
-        from rag.chunking import TextChunker
-        from rag.vector_store import VectorStore
-
-        cfg = RAGConfig.from_env()
-        processor = DocumentProcessor(cfg)
+        processor = _get_processor()
         ok, message, meta = processor.upload_document(file)
         if not ok or not meta:
             return jsonify({"error": message}), 400
+        # The new document is listed even if indexing below fails
+        _invalidate_docs_cache()
 
-        # Load processed text
         doc_id = meta.document_id
-        processed_path = os.path.join(cfg.processed_folder, f"{doc_id}.txt")
-        with open(processed_path, "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read()
-
-        # Chunk and index
-        chunker = TextChunker(cfg)
-        chunks = chunker.chunk_text(text, doc_id)
-        vs = VectorStore(cfg)
-        vs.add_documents(chunks)
-
-        # Update document metadata chunk count (rewrite metadata json)
-        meta_path = os.path.join(cfg.metadata_folder, f"{doc_id}.json")
-        try:
-            import json
-            with open(meta_path, "r", encoding="utf-8") as f:
-                meta_json = json.load(f)
-            meta_json["chunk_count"] = len(chunks)
-            with open(meta_path, "w", encoding="utf-8") as f:
-                json.dump(meta_json, f, indent=2)
-        except Exception:
-            pass
+        _doc_index_add(doc_id, _processed_path(doc_id))
 
+        if UPLOAD_ASYNC:
+            _set_index_job(doc_id, "indexing")
+            _get_upload_pool().submit(_run_index_job, doc_id)
+            return jsonify({
+                "message": message,
+                "document_id": doc_id,
+                "status": "indexing",
+            }), 202
+
+        with _doc_lock(doc_id):
+            chunk_count = _index_document(doc_id)
         return jsonify({
             "message": message,
             "document_id": doc_id,
-            "chunks_indexed": len(chunks),
-            "vector_store": vs.get_stats(),
+            "chunks_indexed": chunk_count,
+            "vector_store": _get_vs().get_stats(),
         }), 201
     except NotImplementedError as nie:
         return jsonify({"error": str(nie)}), 400
@@ -539,16 +946,29 @@ def upload_document():
 @app.route("/documents", methods=["GET"])
 def list_documents():
     """List all processed documents with basic metadata."""
+    global _DOCS_CACHE, _DOCS_CACHE_ETAG, _DOCS_CACHE_DB_VERSION
     try:
-        from rag.config import RAGConfig
-        from rag.document_processor import DocumentProcessor
+        processor = _get_processor()
+        db_version = processor.metadata_version()
+        with _DOCS_CACHE_LOCK:
+            cached, etag, version = _DOCS_CACHE, _DOCS_CACHE_ETAG, _DOCS_CACHE_VERSION
+            if _DOCS_CACHE_DB_VERSION != db_version:
+                cached = None
+        if cached is not None:
+            not_modified = _not_modified(etag)
+            if not_modified is not None:
+                return not_modified
+            response = jsonify({"documents": cached})
+            response.set_etag(etag)
+            return response, 200
 
-        cfg = RAGConfig.from_env()
-        processor = DocumentProcessor(cfg)
         docs = processor.list_documents()
+        with _INDEX_JOBS_LOCK:
+            jobs = dict(_INDEX_JOBS)
         # Serialize
         result = []
         for d in docs:
+            job = jobs.get(d.document_id)
             result.append({
                 "document_id": d.document_id,
                 "filename": d.filename,
@@ -558,9 +978,20 @@ def list_documents():
                 "processed_time": d.processed_time.isoformat() if d.processed_time else None,
                 "text_length": d.text_length,
                 "chunk_count": d.chunk_count,
-                "status": d.status,
+                "status": job["status"] if job else d.status,
+                **({"error": job["error"]} if job and job["error"] else {}),
             })
-        return jsonify({"documents": result}), 200
+        # Content hash, so the tag survives restarts as long as the listing does
+        etag = hashlib.blake2b(_json_dumps(result).encode("utf-8"), digest_size=8).hexdigest()
+        with _DOCS_CACHE_LOCK:
+            if version == _DOCS_CACHE_VERSION:
+                _DOCS_CACHE, _DOCS_CACHE_ETAG, _DOCS_CACHE_DB_VERSION = result, etag, db_version
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        response = jsonify({"documents": result})
+        response.set_etag(etag)
+        return response, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -573,16 +1004,13 @@ def delete_document(document_id: str):
         unauthorized = _check_api_key_only()
         if unauthorized:
             return unauthorized
-        from rag.config import RAGConfig
-        from rag.document_processor import DocumentProcessor
-        from rag.vector_store import VectorStore
-
-        cfg = RAGConfig.from_env()
-        vs = VectorStore(cfg)
-        removed = vs.remove_document(document_id)
-
-        processor = DocumentProcessor(cfg)
-        ok, msg = processor.delete_document(document_id)
+        vs = _get_vs()
+        processor = _get_processor()
+        with _doc_lock(document_id):
+            removed = vs.remove_document(document_id)
+            ok, msg = processor.delete_document(document_id)
+            _doc_index_remove(document_id)
+            _set_index_job(document_id, None)
         status = 200 if ok else 404
         return jsonify({
             "vectors_removed": removed,
@@ -596,36 +1024,48 @@ def delete_document(document_id: str):
 
 @app.route("/documents/<document_id>/content", methods=["GET"])
 def get_document_content(document_id: str):
-    """Get document content for preview or citation (returns first 5000 chars by default)."""
+    """Get document content for preview or citation (returns first 5000 chars by default).
+
+    With ``?raw=1`` the processed text is streamed as text/plain instead,
+    supporting Range and conditional requests.
+    """
     try:
-        from rag.config import RAGConfig
-        cfg = RAGConfig.from_env()
-        processed_dir = getattr(cfg, "processed_folder", None) or os.path.join("documents", "processed")
-        processed_path = os.path.join(processed_dir, f"{document_id}.txt")
+        processed_path = _processed_path(document_id)
         
-        if not os.path.exists(processed_path):
+        try:
+            st = os.stat(processed_path)
+        except FileNotFoundError:
             return jsonify({"error": "Document not found"}), 404
+
+        if request.args.get("raw") in ("1", "true"):
+            return send_file(processed_path, mimetype="text/plain", conditional=True)
         
         # Get optional query param for max length
         max_length = request.args.get('max_length', 5000, type=int)
+
+        # Metadata comes from the index (one primary-key lookup), not the JSON export
+        doc_meta = _get_processor().get_document_metadata(document_id)
+        metadata = doc_meta.to_dict() if doc_meta else {}
+        
+        # The body depends only on the processed file, the metadata and max_length
+        meta_tag = hashlib.blake2b(_json_dumps(metadata).encode("utf-8"), digest_size=8).hexdigest()
+        etag = f"{st.st_mtime_ns:x}-{st.st_size:x}-{meta_tag}-{max_length}"
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
         
         with open(processed_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read(max_length)
         
-        metadata_dir = getattr(cfg, "metadata_folder", None) or os.path.join("documents", "metadata")
-        metadata_path = os.path.join(metadata_dir, f"{document_id}.json")
-        metadata = {}
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-        
-        return jsonify({
+        response = jsonify({
             "document_id": document_id,
             "content": content,
             "full_length": len(content),
             "truncated": len(content) == max_length,
             "metadata": metadata
-        }), 200
+        })
+        response.set_etag(etag)
+        return response, 200
     except Exception as e:
         logger.exception("Get document content failed")
         return jsonify({"error": str(e)}), 500
@@ -635,13 +1075,11 @@ def get_document_content(document_id: str):
 def rag_stats():
     """Return RAG and vector store statistics."""
     try:
-        from rag.config import RAGConfig
-        from rag.retrieval import RetrieverEngine
-
-        cfg = RAGConfig.from_env()
-        engine = RetrieverEngine(cfg)
-        stats = engine.get_stats()
-        return jsonify({"status": "ok", **stats}), 200
+        stats = _get_retriever().get_stats()
+        # Stats are cheap to build; tag the body so pollers get 304s
+        response = jsonify({"status": "ok", **stats})
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
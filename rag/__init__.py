@@ -7,12 +7,26 @@ embedding generation, vector search, and AI response generation.
 
 __version__ = "0.1.0"
 
-# Import main components for easy access
-from .config import RAGConfig
-from .document_processor import DocumentProcessor
-from .vector_store import VectorStore
-from .retrieval import RetrieverEngine
-from .response_generator import ResponseGenerator
+import importlib
+
+# Main components for easy access, imported on first attribute access so that
+# light submodules (e.g. rag.fastuuid) don't pull in FAISS and torch.
+_LAZY_EXPORTS = {
+    "RAGConfig": ".config",
+    "DocumentProcessor": ".document_processor",
+    "VectorStore": ".vector_store",
+    "RetrieverEngine": ".retrieval",
+    "ResponseGenerator": ".response_generator",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
 
 __all__ = [
     "RAGConfig",
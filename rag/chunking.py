@@ -5,24 +5,43 @@ Handles intelligent text splitting with overlap and context preservation.
 """
 
 import re
+from dataclasses import dataclass
 from typing import List, Dict, Any
 import logging
+from bisect import bisect_right
+from itertools import accumulate
 
 from .config import RAGConfig
 
 
 logger = logging.getLogger(__name__)
 
+# Simple sentence boundary detection
+_SENTENCE_RE = re.compile(r'[.!?]+\s+')
+_PAGE_MARKER_RE = re.compile(r'\[PAGE (\d+)\]')
+
+
+@dataclass(slots=True)
+class Chunk:
+    """One chunk of document text; turned into a dict only when stored."""
+    text: str
+    document_id: str
+    chunk_id: str
+    page: int
+    chunk_index: int
+    
+    def metadata(self) -> Dict[str, Any]:
+        return {'page': self.page, 'length': len(self.text), 'chunk_index': self.chunk_index}
+
 
 class TextChunker:
     """Intelligent text chunking with overlap and sentence preservation."""
     
     def __init__(self, config: RAGConfig):
         self.config = config
-        # Simple sentence boundary detection
-        self.sentence_pattern = re.compile(r'[.!?]+\s+')
+        self.sentence_pattern = _SENTENCE_RE
     
-    def chunk_text(self, text: str, document_id: str) -> List[Dict[str, Any]]:
+    def chunk_text(self, text: str, document_id: str) -> List[Chunk]:
         """
         Split text into overlapping chunks.
         
@@ -31,7 +50,7 @@ class TextChunker:
             document_id: Source document identifier
             
         Returns:
-            List of chunk dictionaries
+            List of chunks
         """
         if not text.strip():
             return []
@@ -52,25 +71,29 @@ class TextChunker:
     
     def _split_by_pages(self, text: str) -> List[tuple]:
         """Split text by page markers."""
-        page_pattern = re.compile(r'\[PAGE (\d+)\]')
         pages = []
         
-        parts = page_pattern.split(text)
+        # Each page runs from the end of its marker to the start of the next
+        # one; text before the first marker is dropped
+        prev = None
+        for m in _PAGE_MARKER_RE.finditer(text):
+            if prev is not None:
+                page_text = text[prev.end():m.start()].strip()
+                if page_text:
+                    pages.append((int(prev.group(1)), page_text))
+            prev = m
         
-        if len(parts) == 1:
+        if prev is None:
             # No page markers found
             return [(1, text)]
         
-        for i in range(1, len(parts), 2):
-            if i + 1 < len(parts):
-                page_num = int(parts[i])
-                page_text = parts[i + 1].strip()
-                if page_text:
-                    pages.append((page_num, page_text))
+        page_text = text[prev.end():].strip()
+        if page_text:
+            pages.append((int(prev.group(1)), page_text))
         
         return pages if pages else [(1, text)]
     
-    def _chunk_page_text(self, text: str, document_id: str, page_num: int, start_counter: int) -> List[Dict[str, Any]]:
+    def _chunk_page_text(self, text: str, document_id: str, page_num: int, start_counter: int) -> List[Chunk]:
         """Chunk text from a single page."""
         if not text.strip():
             return []
@@ -91,83 +114,106 @@ class TextChunker:
         """Split text into sentences."""
         # Simple sentence splitting - can be improved with spaCy/NLTK
         sentences = self.sentence_pattern.split(text)
-        return [s.strip() for s in sentences if s.strip()]
+        # Strip once per sentence and drop empties without a Python-level loop
+        return list(filter(None, map(str.strip, sentences)))
     
-    def _create_sentence_chunks(self, sentences: List[str], document_id: str, page_num: int, start_counter: int) -> List[Dict[str, Any]]:
-        """Create chunks preserving sentence boundaries."""
+    def _create_sentence_chunks(self, sentences: List[str], document_id: str, page_num: int, start_counter: int) -> List[Chunk]:
+        """Create chunks preserving sentence boundaries.
+        
+        A chunk grows by len(sentence) + 1 per sentence until the next one
+        would push it past chunk_size. With prefix sums of those widths, the
+        sentence that closes each chunk is found with one bisect
+        instead of a Python step per sentence.
+        """
         chunks = []
-        current_chunk = []
-        current_length = 0
+        n = len(sentences)
+        if not n:
+            return chunks
+        chunk_size = self.config.chunk_size
         chunk_id = start_counter
         
-        for sentence in sentences:
-            sentence_length = len(sentence)
+        # prefix[k] = sum of len(s) + 1 over sentences[:k]
+        prefix = list(accumulate((len(s) + 1 for s in sentences), initial=0))
+        
+        # The chunk being built: optional overlap text plus sentences[start:],
+        # with current_length as it stood right after sentences[start] was added
+        overlap_text = ""
+        start = 0
+        current_length = prefix[1]
+        
+        while True:
+            # Sentence i closes the chunk when current_length grown up to i,
+            # plus len(sentences[i]), exceeds chunk_size:
+            #   prefix[i + 1] > chunk_size - current_length + prefix[start + 1] + 1
+            limit = chunk_size - current_length + prefix[start + 1] + 1
+            i = max(bisect_right(prefix, limit, start + 2) - 1, start + 1)
+            if i >= n:
+                break
             
-            # If adding this sentence would exceed chunk size
-            if current_length + sentence_length > self.config.chunk_size and current_chunk:
-                # Create chunk from current sentences
-                chunk_text = ' '.join(current_chunk)
-                chunks.append(self._create_chunk_dict(chunk_text, document_id, page_num, chunk_id))
-                chunk_id += 1
-                
-                # Start new chunk with overlap
-                overlap_text = self._get_overlap_text(current_chunk)
-                current_chunk = [overlap_text, sentence] if overlap_text else [sentence]
-                current_length = len(' '.join(current_chunk))
-            else:
-                # Add sentence to current chunk
-                current_chunk.append(sentence)
-                current_length += sentence_length + 1  # +1 for space
-        
-        # Add final chunk if not empty
-        if current_chunk:
+            # Create chunk from current sentences
+            current_chunk = sentences[start:i]
+            if overlap_text:
+                current_chunk.insert(0, overlap_text)
             chunk_text = ' '.join(current_chunk)
-            chunks.append(self._create_chunk_dict(chunk_text, document_id, page_num, chunk_id))
+            chunks.append(self._create_chunk(chunk_text, document_id, page_num, chunk_id))
+            chunk_id += 1
+            
+            # Start new chunk with overlap
+            overlap_text = self._get_overlap_text(current_chunk, chunk_text)
+            sentence_length = len(sentences[i])
+            current_length = len(overlap_text) + 1 + sentence_length if overlap_text else sentence_length
+            start = i
+        
+        # Add final chunk
+        current_chunk = sentences[start:]
+        if overlap_text:
+            current_chunk.insert(0, overlap_text)
+        chunk_text = ' '.join(current_chunk)
+        chunks.append(self._create_chunk(chunk_text, document_id, page_num, chunk_id))
         
         return chunks
     
-    def _create_character_chunks(self, text: str, document_id: str, page_num: int, start_counter: int) -> List[Dict[str, Any]]:
+    def _create_character_chunks(self, text: str, document_id: str, page_num: int, start_counter: int) -> List[Chunk]:
         """Create chunks based on character count."""
         chunks = []
         chunk_id = start_counter
+        chunk_size = self.config.chunk_size
         
-        for i in range(0, len(text), self.config.chunk_size - self.config.chunk_overlap):
-            end_pos = min(i + self.config.chunk_size, len(text))
-            chunk_text = text[i:end_pos].strip()
+        for i in range(0, len(text), chunk_size - self.config.chunk_overlap):
+            chunk_text = text[i:i + chunk_size]
+            # Most windows start and end mid-word; only strip when an edge is whitespace
+            if chunk_text[0].isspace() or chunk_text[-1].isspace():
+                chunk_text = chunk_text.strip()
             
             if chunk_text:
-                chunks.append(self._create_chunk_dict(chunk_text, document_id, page_num, chunk_id))
+                chunks.append(self._create_chunk(chunk_text, document_id, page_num, chunk_id))
                 chunk_id += 1
         
         return chunks
     
-    def _get_overlap_text(self, sentences: List[str]) -> str:
-        """Get overlap text from the end of current chunk."""
-        if not sentences:
-            return ""
+    def _get_overlap_text(self, sentences: List[str], chunk_text: str) -> str:
+        """Get overlap text from the end of current chunk.
         
+        chunk_text is ' '.join(sentences); the overlap is returned as a
+        suffix slice of it rather than re-joined.
+        """
         # Take last few sentences that fit within overlap size
-        overlap_sentences = []
+        chunk_overlap = self.config.chunk_overlap
         overlap_length = 0
+        count = 0
         
         for sentence in reversed(sentences):
-            if overlap_length + len(sentence) <= self.config.chunk_overlap:
-                overlap_sentences.insert(0, sentence)
+            if overlap_length + len(sentence) <= chunk_overlap:
                 overlap_length += len(sentence)
+                count += 1
             else:
                 break
         
-        return ' '.join(overlap_sentences)
+        if not count:
+            return ""
+        # Sentences plus the single spaces joining them
+        return chunk_text[len(chunk_text) - overlap_length - (count - 1):]
     
-    def _create_chunk_dict(self, text: str, document_id: str, page_num: int, chunk_id: int) -> Dict[str, Any]:
-        """Create a standardized chunk dictionary."""
-        return {
-            'text': text,
-            'document_id': document_id,
-            'chunk_id': f"{document_id}_chunk_{chunk_id:04d}",
-            'metadata': {
-                'page': page_num,
-                'length': len(text),
-                'chunk_index': chunk_id
-            }
-        }
+    def _create_chunk(self, text: str, document_id: str, page_num: int, chunk_id: int) -> Chunk:
+        """Create a standardized chunk."""
+        return Chunk(text, document_id, f"{document_id}_chunk_{chunk_id:04d}", page_num, chunk_id)
@@ -10,9 +10,21 @@ from typing import Optional
 from dataclasses import dataclass
 
 
-@dataclass
+# Pages per task for multi-process PDF extraction (pypdf backend), picked by
+# page count: the first rule whose max_pages covers the document wins. Small
+# documents keep batches small so all workers stay busy, large ones raise them
+# to cut IPC round trips. Whether the pool is used at all is decided by
+# RAGConfig.pdf_parallel_threshold.
+PDF_POOL_BATCH_RULES = (
+    {"max_pages": 200, "batch_size": 4},
+    {"max_pages": 1000, "batch_size": 16},
+    {"max_pages": None, "batch_size": 64},
+)
+
+
+@dataclass(frozen=True, slots=True)
 class RAGConfig:
-    """Configuration class for RAG pipeline settings."""
+    """Configuration class for RAG pipeline settings (immutable once built)."""
     
     # Document Processing
     max_file_size: int = 10 * 1024 * 1024  # 10MB
@@ -20,6 +32,8 @@ class RAGConfig:
     upload_folder: str = './documents/raw'
     processed_folder: str = './documents/processed'
     metadata_folder: str = './documents/metadata'
+    pdf_backend: str = "auto"  # options: auto, pypdfium, pypdf
+    pdf_parallel_threshold: int = 10  # pypdf: pages before extraction moves to a process pool
     
     # Text Chunking
     chunk_size: int = 800
@@ -30,11 +44,20 @@ class RAGConfig:
     embedding_model: str = "all-MiniLM-L6-v2"
     embedding_dimension: int = 384
     device: str = "cpu"
+    embedding_cache_size: int = 1024  # recent query strings whose embeddings are kept; 0 disables
     
     # Vector Database
     vector_db_path: str = "./vector_store"
     similarity_threshold: float = 0.7
     top_k_results: int = 5
+    index_type: str = "flat"  # options: flat (exact), hnsw (approximate, sub-linear search)
+    vector_quantization: str = "fp32"  # options: fp32, fp16 (half the memory), int8 (a quarter)
+    hnsw_m: int = 32  # graph neighbours per node
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64  # search beam; raised to k when k is larger
+    query_cache_size: int = 256  # recent query embeddings whose results are reused; 0 disables
+    query_cache_threshold: float = 0.95  # cosine similarity for a query to reuse cached results
+    search_threads: int = 0  # FAISS OpenMP threads; 0 uses every core, 1 suits many concurrent workers
     
     # LLM Configuration
     openai_api_key: Optional[str] = None
@@ -44,6 +67,9 @@ class RAGConfig:
     # LLM Provider selection
     llm_provider: str = "openai"  # options: openai, gemini
     gemini_api_key: Optional[str] = None
+    llm_timeout: float = 30.0  # seconds per LLM request
+    llm_cache_size: int = 1024  # cached temperature-0 completions; 0 disables
+    llm_max_retries: int = 1  # client-side retries (OpenAI); kept low so they don't stack on caller retries
     
     # Performance
     batch_size: int = 32
@@ -52,37 +78,53 @@ class RAGConfig:
     @classmethod
     def from_env(cls) -> 'RAGConfig':
         """Create configuration from environment variables."""
+        # Slots replace the class-level defaults, so read them off an instance
+        defaults = cls()
         return cls(
             # Document Processing
-            max_file_size=int(os.getenv('MAX_FILE_SIZE', cls.max_file_size)),
-            upload_folder=os.getenv('UPLOAD_FOLDER', cls.upload_folder),
-            processed_folder=os.getenv('PROCESSED_FOLDER', cls.processed_folder),
-            metadata_folder=os.getenv('METADATA_FOLDER', cls.metadata_folder),
+            max_file_size=int(os.getenv('MAX_FILE_SIZE', defaults.max_file_size)),
+            upload_folder=os.getenv('UPLOAD_FOLDER', defaults.upload_folder),
+            processed_folder=os.getenv('PROCESSED_FOLDER', defaults.processed_folder),
+            metadata_folder=os.getenv('METADATA_FOLDER', defaults.metadata_folder),
+            pdf_backend=os.getenv('PDF_BACKEND', defaults.pdf_backend),
+            pdf_parallel_threshold=int(os.getenv('PDF_PARALLEL_THRESHOLD', defaults.pdf_parallel_threshold)),
             
             # Text Chunking
-            chunk_size=int(os.getenv('CHUNK_SIZE', cls.chunk_size)),
-            chunk_overlap=int(os.getenv('CHUNK_OVERLAP', cls.chunk_overlap)),
+            chunk_size=int(os.getenv('CHUNK_SIZE', defaults.chunk_size)),
+            chunk_overlap=int(os.getenv('CHUNK_OVERLAP', defaults.chunk_overlap)),
             
             # Embedding Model
-            embedding_model=os.getenv('EMBEDDING_MODEL', cls.embedding_model),
-            device=os.getenv('DEVICE', cls.device),
+            embedding_model=os.getenv('EMBEDDING_MODEL', defaults.embedding_model),
+            device=os.getenv('DEVICE', defaults.device),
+            embedding_cache_size=int(os.getenv('EMBEDDING_CACHE_SIZE', defaults.embedding_cache_size)),
             
             # Vector Database
-            vector_db_path=os.getenv('VECTOR_DB_PATH', cls.vector_db_path),
-            similarity_threshold=float(os.getenv('SIMILARITY_THRESHOLD', cls.similarity_threshold)),
-            top_k_results=int(os.getenv('TOP_K_RESULTS', cls.top_k_results)),
+            vector_db_path=os.getenv('VECTOR_DB_PATH', defaults.vector_db_path),
+            similarity_threshold=float(os.getenv('SIMILARITY_THRESHOLD', defaults.similarity_threshold)),
+            top_k_results=int(os.getenv('TOP_K_RESULTS', defaults.top_k_results)),
+            index_type=os.getenv('INDEX_TYPE', defaults.index_type),
+            vector_quantization=os.getenv('VECTOR_QUANTIZATION', defaults.vector_quantization),
+            hnsw_m=int(os.getenv('HNSW_M', defaults.hnsw_m)),
+            hnsw_ef_construction=int(os.getenv('HNSW_EF_CONSTRUCTION', defaults.hnsw_ef_construction)),
+            hnsw_ef_search=int(os.getenv('HNSW_EF_SEARCH', defaults.hnsw_ef_search)),
+            query_cache_size=int(os.getenv('QUERY_CACHE_SIZE', defaults.query_cache_size)),
+            query_cache_threshold=float(os.getenv('QUERY_CACHE_THRESHOLD', defaults.query_cache_threshold)),
+            search_threads=int(os.getenv('SEARCH_THREADS', defaults.search_threads)),
             
             # LLM Configuration
             openai_api_key=os.getenv('OPENAI_API_KEY'),
-            default_model=os.getenv('DEFAULT_MODEL', cls.default_model),
-            max_tokens=int(os.getenv('MAX_TOKENS', cls.max_tokens)),
-            temperature=float(os.getenv('TEMPERATURE', cls.temperature)),
-            llm_provider=os.getenv('LLM_PROVIDER', cls.llm_provider),
+            default_model=os.getenv('DEFAULT_MODEL', defaults.default_model),
+            max_tokens=int(os.getenv('MAX_TOKENS', defaults.max_tokens)),
+            temperature=float(os.getenv('TEMPERATURE', defaults.temperature)),
+            llm_provider=os.getenv('LLM_PROVIDER', defaults.llm_provider),
             gemini_api_key=os.getenv('GEMINI_API_KEY'),
+            llm_timeout=float(os.getenv('LLM_TIMEOUT', defaults.llm_timeout)),
+            llm_cache_size=int(os.getenv('LLM_CACHE_SIZE', defaults.llm_cache_size)),
+            llm_max_retries=int(os.getenv('LLM_MAX_RETRIES', defaults.llm_max_retries)),
             
             # Performance
-            batch_size=int(os.getenv('BATCH_SIZE', cls.batch_size)),
-            max_context_length=int(os.getenv('MAX_CONTEXT_LENGTH', cls.max_context_length)),
+            batch_size=int(os.getenv('BATCH_SIZE', defaults.batch_size)),
+            max_context_length=int(os.getenv('MAX_CONTEXT_LENGTH', defaults.max_context_length)),
         )
     
     def validate(self) -> None:
@@ -95,3 +137,13 @@ class RAGConfig:
             raise ValueError("similarity_threshold must be between 0 and 1")
         if self.top_k_results <= 0:
             raise ValueError("top_k_results must be positive")
+        if self.index_type not in ("flat", "hnsw"):
+            raise ValueError("index_type must be one of: flat, hnsw")
+        if self.vector_quantization not in ("fp32", "fp16", "int8"):
+            raise ValueError("vector_quantization must be one of: fp32, fp16, int8")
+        if not 0 < self.query_cache_threshold <= 1:
+            raise ValueError("query_cache_threshold must be in (0, 1]")
+        if self.search_threads < 0:
+            raise ValueError("search_threads must be 0 (all cores) or positive")
+        if self.pdf_backend not in ("auto", "pypdfium", "pypdf"):
+            raise ValueError("pdf_backend must be one of: auto, pypdfium, pypdf")
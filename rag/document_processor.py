@@ -6,22 +6,106 @@ for various document formats (PDF, TXT, DOCX).
 """
 
 import os
+import re
 import json
+import shutil
 import hashlib
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+import functools
+import itertools
+import sqlite3
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import ClassVar, Dict, List, Optional, Set, Tuple
+from dataclasses import asdict, dataclass
 from datetime import datetime
 import logging
 
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
-from .config import RAGConfig
+from .config import RAGConfig, PDF_POOL_BATCH_RULES
 from pypdf import PdfReader
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+try:
+    import pypdfium2 as pdfium
+    PYPDFIUM_AVAILABLE = True
+except ImportError:
+    PYPDFIUM_AVAILABLE = False
+
 
 logger = logging.getLogger(__name__)
 
+# Spaced-out PDF text ("A s s i g n m e n t")
+# Lookbehind instead of capturing the letter: a plain '' replacement skips
+# template expansion, ~3x faster per line than sub(r'\1')
+_SPACED_FIX_RE = re.compile(r'(?<=\w)\s+(?=\w\s|\w$)')
+# At least 4 spaced characters; group 1 is one full spaced-out line. Anchoring
+# on a literal newline rather than MULTILINE ^ lets the engine skip straight
+# to line starts instead of trying every position.
+_SPACED_LINE_RE = re.compile(r'\n((?:\w[^\S\n]){4,}[^\n]*)')
+_SPACED_FIRST_LINE_RE = re.compile(r'(?:\w[^\S\n]){4,}[^\n]*')
+
+_NON_SPACE_RE = re.compile(r'\S')
+
+# Front matter detection
+_CHAPTER_RE = re.compile(r'^(CHAPTER\s+1|1[\s.:]+INTRODUCTION|CHAPTER\s+ONE)')
+_SECTION_RE = re.compile(r'^1\.[0-9]')
+_TOC_DOTS_RE = re.compile(r'\.(\s*\.){2,}')  # ". . ." or "....."
+_TOC_LINE_RE = re.compile(r'\.(\s*\.){2,}|\d+$')  # TOC dots or trailing page number
+
+# Whole-text variants of the above, used to find candidate lines in one pass.
+# [^\S\n] keeps whitespace matches inside a single line.
+_CONTENT_ANCHOR_RE = re.compile(
+    r'^[^\S\n]*(?:CHAPTER[^\S\n]+(?:1|ONE)|1(?:[^\S\n]|[.:])+INTRODUCTION|1\.[0-9])',
+    re.MULTILINE | re.IGNORECASE,
+)
+_LONG_LINE_RE = re.compile(r'^[^\n]{101,}', re.MULTILINE)
+_TOC_MARK_RE = re.compile(r'\.(?:[^\S\n]*\.){2,}|\d+$', re.MULTILINE)
+
+_FRONT_MATTER_KEYWORDS = (
+    'TABLE OF CONTENTS', 'CONTENTS', 'LIST OF FIGURES', 'LIST OF TABLES',
+    'PLAGIARISM', 'CERTIFICATE', 'DECLARATION', 'ACKNOWLEDGEMENT',
+    'DEDICATION', 'APPROVAL', 'ABSTRACT'
+)
+# Case-insensitive form of the keywords; only equivalent to the .upper()
+# check for ASCII lines (upper() expands ligatures like "\ufb01" -> "FI")
+_FRONT_MATTER_KEYWORDS_RE = re.compile(
+    '|'.join(re.escape(k) for k in _FRONT_MATTER_KEYWORDS), re.IGNORECASE
+)
+
+
+def _line_end(text: str, start: int) -> int:
+    end = text.find('\n', start)
+    return len(text) if end == -1 else end
+
+
+def _line_start_before(text: str, line_start: int, back: int) -> int:
+    """Offset of the line `back` lines above the one starting at line_start."""
+    for _ in range(back):
+        line_start = text.rfind('\n', 0, line_start - 1) + 1
+    return line_start
+
+
+def _nth_line_start(text: str, n: int) -> int:
+    pos = 0
+    for _ in range(n):
+        pos = text.index('\n', pos) + 1
+    return pos
+
 
 @dataclass
 class DocumentMetadata:
@@ -35,53 +119,227 @@ class DocumentMetadata:
     text_length: int = 0
     page_count: int = 0
     chunk_count: int = 0
-    status: str = "uploaded"  # uploaded, processing, processed, error
+    status: str = "uploaded"  # uploaded, processing, processed, error, failed (indexing)
+    content_hash: Optional[str] = None  # BLAKE3 (or SHA-256) of the raw upload
+    
+    def to_dict(self) -> Dict:
+        """JSON-ready dict, in the same shape as the per-document export."""
+        return _metadata_to_dict(self)
+
+@functools.lru_cache(maxsize=None)
+def _docx_document_class():
+    """Import python-docx on first DOCX upload; failures are retried next time."""
+    try:
+        from docx import Document  # type: ignore
+    except Exception as e:
+        raise NotImplementedError(
+            "DOCX support requires python-docx. Install with: pip install python-docx"
+        ) from e
+    return Document
+
+
+@functools.lru_cache(maxsize=None)
+def _docx_run_content_xpath():
+    """Compiled XPath for a paragraph's text-bearing run content, in document order.
+    
+    Same elements python-docx's paragraph.text visits (runs, and runs inside
+    hyperlinks), but evaluated once in lxml rather than one xpath() call per
+    paragraph, run and hyperlink.
+    """
+    from lxml import etree
+    from docx.oxml.ns import nsmap  # type: ignore
+    return etree.XPath(
+        "(w:r | w:hyperlink/w:r)/*[self::w:br or self::w:cr or self::w:noBreakHyphen"
+        " or self::w:ptab or self::w:t or self::w:tab]",
+        namespaces=nsmap,
+    )
+
+
+def _docx_row_cell_texts(tr, table) -> List[str]:
+    """Cell texts of a table row, as python-docx's row.cells would give them.
+    
+    Reads the row's XML directly instead of building _Row/_Cell/Paragraph
+    wrappers. A horizontally merged cell repeats once per grid column, as in
+    python-docx; rows with vertically merged continuation cells, whose text
+    lives in a row above, go through python-docx's own resolution.
+    """
+    run_content = _docx_run_content_xpath()
+    texts = []
+    for tc in tr.tc_lst:
+        if tc.vMerge == "continue":
+            from docx.table import _Row  # type: ignore
+            return [cell.text for cell in _Row(tr, table).cells]
+        # str() of each element is its text equivalent (w:tab -> "\t", w:br -> "\n", ...)
+        text = "\n".join("".join(map(str, run_content(p))) for p in tc.p_lst)
+        texts.extend([text] * tc.grid_span)
+    return texts
+
+
+# Uploads are copied and hashed in chunks of this size
+_UPLOAD_CHUNK_SIZE = 1 << 20
+# Write buffer (and slice size) for processed text files
+_TEXT_WRITE_BUFFER = 1 << 20
+# Leading bytes kept from each upload for the file signature check
+_SIGNATURE_WINDOW = 1024
+# Signatures by extension. PDF readers accept a header anywhere in the first
+# 1 KiB; DOCX is a ZIP archive. TXT is decoded leniently, so it has none.
+_FILE_SIGNATURES = {
+    'pdf': lambda head: b'%PDF-' in head,
+    'docx': lambda head: head.startswith(b'PK\x03\x04'),
+}
+
+def _pool_batch_size(page_count: int) -> int:
+    for rule in PDF_POOL_BATCH_RULES:
+        if rule["max_pages"] is None or page_count <= rule["max_pages"]:
+            return rule["batch_size"]
+    return PDF_POOL_BATCH_RULES[-1]["batch_size"]
+
+
+# Per-worker PdfReader, opened once by the pool initializer
+_worker_reader = None
+
+
+def _init_pdf_worker(file_path: str) -> None:
+    global _worker_reader
+    _worker_reader = PdfReader(file_path)
+
+
+def _extract_one_page(index: int) -> str:
+    return DocumentProcessor._clean_spaced_text(_worker_reader.pages[index].extract_text() or "")
+
+
+# Metadata index, stored next to the per-document JSON exports
+METADATA_DB_NAME = "documents.db"
+_METADATA_COLUMNS = (
+    'document_id', 'filename', 'file_size', 'file_type', 'upload_time',
+    'processed_time', 'text_length', 'page_count', 'chunk_count', 'status',
+    'content_hash',
+)
+_INSERT_METADATA_SQL = (
+    f"INSERT OR REPLACE INTO documents ({', '.join(_METADATA_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_METADATA_COLUMNS))})"
+)
+
+
+def _metadata_to_dict(metadata: DocumentMetadata) -> Dict:
+    d = asdict(metadata)
+    d['upload_time'] = metadata.upload_time.isoformat()
+    d['processed_time'] = metadata.processed_time.isoformat() if metadata.processed_time else None
+    return d
+
+
+def _metadata_from_row(row) -> DocumentMetadata:
+    """Inverse of _metadata_to_dict, for index rows (or dicts with the same keys)."""
+    data = dict(row)
+    data['upload_time'] = datetime.fromisoformat(data['upload_time'])
+    data['processed_time'] = datetime.fromisoformat(data['processed_time']) if data['processed_time'] else None
+    return DocumentMetadata(**data)
+
+
+def _split_filename(filename: str) -> Tuple[str, str]:
+    """Split into (name without extension, lowercased extension without the dot).
+    
+    Unlike os.path.splitext/PurePath.suffix, a dot-file like ".pdf" still
+    has extension "pdf", matching how uploads have always been typed.
+    """
+    stem, dot, ext = filename.rpartition('.')
+    return (stem, ext.lower()) if dot else (filename, '')
+
+
+def _remove_if_exists(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
 
 
 class DocumentProcessor:
     """Handles document upload and text extraction."""
     
+    # Directories already created by any instance in this process
+    _ready_dirs: ClassVar[Set[str]] = set()
+    
     def __init__(self, config: RAGConfig):
         self.config = config
+        self._allowed_types = frozenset(ext.lstrip('.').lower() for ext in config.allowed_extensions)
         self._ensure_directories()
+        # One connection shared by request threads; sqlite3 calls are serialized by the lock
+        self._db_lock = threading.Lock()
+        self._db = self._open_metadata_db()
+        # JSON exports are written off the request thread; one worker keeps
+        # writes and deletes for a document in submission order
+        self._export_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metadata-export")
     
     def _ensure_directories(self) -> None:
-        """Create necessary directories if they don't exist."""
-        for directory in [
+        """Create necessary directories if they don't exist (once per process per path)."""
+        for directory in (
             self.config.upload_folder,
             self.config.processed_folder,
             self.config.metadata_folder
-        ]:
-            os.makedirs(directory, exist_ok=True)
+        ):
+            if directory not in DocumentProcessor._ready_dirs:
+                os.makedirs(directory, exist_ok=True)
+                DocumentProcessor._ready_dirs.add(directory)
     
-    def _generate_document_id(self, filename: str, content: bytes) -> str:
-        """Generate unique document ID based on filename and content hash."""
-        content_hash = hashlib.md5(content).hexdigest()[:8]
+    def _open_metadata_db(self) -> sqlite3.Connection:
+        """Open (creating if needed) the SQLite metadata index in metadata_folder.
+
+        Per-document JSON files that aren't in the index yet (e.g. from before
+        the index existed) are imported on open.
+        """
+        db = sqlite3.connect(
+            os.path.join(self.config.metadata_folder, METADATA_DB_NAME),
+            isolation_level=None,  # autocommit; every statement is its own transaction
+            check_same_thread=False,
+        )
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, filename TEXT, file_size INTEGER, file_type TEXT, "
+            "upload_time TEXT, processed_time TEXT, text_length INTEGER, page_count INTEGER, "
+            "chunk_count INTEGER, status TEXT, content_hash TEXT)"
+        )
+        if 'content_hash' not in {row['name'] for row in db.execute("PRAGMA table_info(documents)")}:
+            db.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_documents_upload_time ON documents(upload_time)")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash)")
+        self._import_json_metadata(db)
+        return db
+    
+    def _import_json_metadata(self, db: sqlite3.Connection) -> None:
+        known = {row[0] for row in db.execute("SELECT document_id FROM documents")}
+        rows = []
+        with os.scandir(self.config.metadata_folder) as it:
+            for entry in it:
+                if not entry.name.endswith('.json') or entry.name[:-5] in known:
+                    continue
+                try:
+                    with open(entry.path, 'rb') as f:
+                        raw = f.read()
+                    data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+                    data.setdefault('content_hash', None)  # exports from before it was recorded
+                    rows.append(tuple(data[column] for column in _METADATA_COLUMNS))
+                except Exception as e:
+                    logger.error(f"Failed to import metadata file {entry.name}: {str(e)}")
+        if rows:
+            db.executemany(_INSERT_METADATA_SQL.replace("INSERT OR REPLACE", "INSERT OR IGNORE"), rows)
+            logger.info(f"Imported {len(rows)} metadata files into {METADATA_DB_NAME}")
+    
+    def _generate_document_id(self, name: str, content_hash: str) -> str:
+        """Generate unique document ID based on the filename (sans extension) and content hash."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = secure_filename(filename).rsplit('.', 1)[0]
-        return f"{safe_filename}_{timestamp}_{content_hash}"
+        return f"{secure_filename(name) or 'document'}_{timestamp}_{content_hash[:8]}"
     
     def _validate_file(self, file: FileStorage) -> Tuple[bool, str]:
-        """Validate uploaded file."""
+        """Validate uploaded file name and type (size is checked while saving)."""
         if not file or not file.filename:
             return False, "No file provided"
         
         # Check file extension
-        filename = file.filename.lower()
-        if not any(filename.endswith(ext) for ext in self.config.allowed_extensions):
+        if _split_filename(file.filename)[1] not in self._allowed_types:
             return False, f"File type not allowed. Supported: {', '.join(self.config.allowed_extensions)}"
         
-        # Check file size (read content to get actual size)
-        file.seek(0, 2)  # Seek to end
-        file_size = file.tell()
-        file.seek(0)  # Reset to beginning
-        
-        if file_size > self.config.max_file_size:
-            return False, f"File too large. Max size: {self.config.max_file_size // (1024*1024)}MB"
-        
-        if file_size == 0:
-            return False, "Empty file"
-        
         return True, "Valid"
     
     def upload_document(self, file: FileStorage) -> Tuple[bool, str, Optional[DocumentMetadata]]:
@@ -97,39 +355,55 @@ class DocumentProcessor:
             if not is_valid:
                 return False, message, None
             
-            # Read file content
-            content = file.read()
-            file.seek(0)  # Reset for potential re-reading
+            # Save raw file, hashing and sizing it on the way; the ID (and so
+            # the final name) depends on the hash, so write to a temp file first
+            file_size, content_hash, tmp_path, head = self._save_upload(file)
+            if file_size > self.config.max_file_size:
+                _remove_if_exists(tmp_path)
+                return False, f"File too large. Max size: {self.config.max_file_size // (1024*1024)}MB", None
+            if file_size == 0:
+                _remove_if_exists(tmp_path)
+                return False, "Empty file", None
+            
+            # Reject mis-extensioned files before any extraction work
+            name, file_type = _split_filename(file.filename)
+            signature = _FILE_SIGNATURES.get(file_type)
+            if signature is not None and not signature(head):
+                _remove_if_exists(tmp_path)
+                return False, f"File content does not match its .{file_type} extension", None
             
             # Generate document ID and metadata
-            doc_id = self._generate_document_id(file.filename, content)
+            doc_id = self._generate_document_id(name, content_hash)
             
             metadata = DocumentMetadata(
                 document_id=doc_id,
                 filename=file.filename,
-                file_size=len(content),
-                file_type=file.filename.rsplit('.', 1)[1].lower(),
-                upload_time=datetime.now()
+                file_size=file_size,
+                file_type=file_type,
+                upload_time=datetime.now(),
+                content_hash=content_hash
             )
             
-            # Save raw file
             raw_path = os.path.join(self.config.upload_folder, f"{doc_id}.{metadata.file_type}")
-            with open(raw_path, 'wb') as f:
-                f.write(content)
+            os.replace(tmp_path, raw_path)
             
-            # Extract text
-            text_content = self._extract_text(raw_path, metadata.file_type)
-            if not text_content.strip():
-                return False, "No text content could be extracted", None
-            
-            # Save processed text
+            # Extract text straight into the processed text file
             processed_path = os.path.join(self.config.processed_folder, f"{doc_id}.txt")
-            with open(processed_path, 'w', encoding='utf-8') as f:
-                f.write(text_content)
+            try:
+                # Byte-identical uploads share the earlier extraction
+                text_length = self._reuse_extracted_text(metadata, processed_path)
+                if text_length is None:
+                    text_length = self._extract_text(raw_path, metadata.file_type, processed_path)
+            except Exception:
+                _remove_if_exists(processed_path)
+                raise
+            if not text_length:
+                _remove_if_exists(processed_path)
+                return False, "No text content could be extracted", None
             
             # Update metadata
             metadata.processed_time = datetime.now()
-            metadata.text_length = len(text_content)
+            metadata.text_length = text_length
             metadata.status = "processed"
             
             # Save metadata
@@ -142,35 +416,172 @@ class DocumentProcessor:
             logger.error(f"Error processing document: {str(e)}")
             return False, f"Processing error: {str(e)}", None
     
-    def _extract_text(self, file_path: str, file_type: str) -> str:
-        """Extract text from various file formats."""
+    def _save_upload(self, file: FileStorage) -> Tuple[int, str, str, bytes]:
+        """Copy the upload to a temp file in upload_folder in fixed-size chunks.
+        
+        Stops early once the size limit is exceeded.
+        
+        Returns:
+            (bytes written, content hash, temp file path, leading bytes)
+        """
+        # Full digest keys the extraction cache; the document ID uses 8 hex chars of it.
+        # BLAKE3 is SIMD-accelerated; hashlib's SHA-256 uses the CPU's SHA
+        # extensions through OpenSSL, and both beat BLAKE2b/MD5 on upload-sized data.
+        hasher = blake3.blake3() if BLAKE3_AVAILABLE else hashlib.sha256()
+        total = 0
+        head = b''
+        fd, tmp_path = tempfile.mkstemp(dir=self.config.upload_folder, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while chunk := file.stream.read(_UPLOAD_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    out.write(chunk)
+                    if total < _SIGNATURE_WINDOW:
+                        head += chunk[:_SIGNATURE_WINDOW - total]
+                    total += len(chunk)
+                    if total > self.config.max_file_size:
+                        break
+        except Exception:
+            _remove_if_exists(tmp_path)
+            raise
+        return total, hasher.hexdigest(), tmp_path, head
+    
+    def _reuse_extracted_text(self, metadata: DocumentMetadata, out_path: str) -> Optional[int]:
+        """Link (or copy) the processed text of an earlier upload with the same content.
+        
+        Returns:
+            text_length of the reused text, or None if there is nothing to reuse
+        """
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT document_id, text_length FROM documents "
+                "WHERE content_hash = ? AND file_type = ? AND status = 'processed' "
+                "ORDER BY upload_time DESC",
+                (metadata.content_hash, metadata.file_type),
+            ).fetchall()
+        for row in rows:
+            source = os.path.join(self.config.processed_folder, f"{row['document_id']}.txt")
+            if source == out_path:
+                continue
+            try:
+                try:
+                    # Hard link: each document still owns (and deletes) its own name
+                    os.link(source, out_path)
+                except OSError:
+                    shutil.copyfile(source, out_path)
+            except FileNotFoundError:
+                continue
+            logger.info(f"Reusing extracted text of {row['document_id']} for {metadata.document_id}")
+            return row['text_length']
+        return None
+    
+    def _extract_text(self, file_path: str, file_type: str, out_path: str) -> int:
+        """Extract text from various file formats and write it to out_path.
+        
+        Returns:
+            Length of the extracted text, or 0 if it is empty or only whitespace
+        """
         try:
             if file_type == 'pdf':
-                return self._extract_pdf_text(file_path)
+                return self._extract_pdf_text_to_file(file_path, out_path)
             elif file_type == 'txt':
-                return self._extract_txt_text(file_path)
+                text = self._extract_txt_text(file_path)
             elif file_type == 'docx':
-                return self._extract_docx_text(file_path)
+                text = self._extract_docx_text(file_path)
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            return len(text) if _NON_SPACE_RE.search(text) else 0
         except Exception as e:
             logger.error(f"Text extraction failed for {file_path}: {str(e)}")
             raise
     
-    def _extract_pdf_text(self, file_path: str) -> str:
-        """Extract text from PDF file."""
-        reader = PdfReader(file_path)
-        texts = []
-        for page in reader.pages:
-            txt = page.extract_text() or ""
-            texts.append(txt)
-        raw_text = "\n\n".join(texts)
+    def _extract_pdf_text_to_file(self, file_path: str, out_path: str) -> int:
+        """Extract text from PDF file page by page into out_path.
+
+        Only the current page is held in memory while extracting; the file is
+        read back once for front matter removal, which needs the whole text,
+        and the kept part is written out in slices rather than copied whole.
+        newline='' keeps the read-back text identical to what was extracted.
+        """
+        if self._use_pdfium():
+            pages = self._iter_pdfium_pages(file_path)
+        else:
+            pages = self._iter_pdf_pages(file_path, PdfReader(file_path))
+        with open(out_path, 'w', encoding='utf-8', newline='', buffering=_TEXT_WRITE_BUFFER) as f:
+            for i, page_text in enumerate(pages):
+                if i:
+                    f.write("\n\n")
+                f.write(page_text)
+        
+        with open(out_path, 'r', encoding='utf-8', newline='') as f:
+            cleaned_text = f.read()
         
-        # Clean up spaced-out characters (e.g., "A s s i g n m e n t" → "Assignment")
-        cleaned_text = self._clean_spaced_text(raw_text)
+        # Remove front matter (TOC, title pages, etc.)
+        offset = self._front_matter_end(cleaned_text)
+        if offset:
+            with open(out_path, 'w', encoding='utf-8', newline='', buffering=_TEXT_WRITE_BUFFER) as f:
+                for pos in range(offset, len(cleaned_text), _TEXT_WRITE_BUFFER):
+                    f.write(cleaned_text[pos:pos + _TEXT_WRITE_BUFFER])
+        if not _NON_SPACE_RE.search(cleaned_text, offset):
+            return 0
+        return len(cleaned_text) - offset
+    
+    def _use_pdfium(self) -> bool:
+        """Whether to extract PDFs with pypdfium2 rather than pypdf."""
+        backend = self.config.pdf_backend
+        if backend == "pypdf":
+            return False
+        if not PYPDFIUM_AVAILABLE:
+            if backend == "pypdfium":
+                logger.warning("pdf_backend=pypdfium but pypdfium2 is not installed; using pypdf")
+            return False
+        return True
+    
+    def _iter_pdfium_pages(self, file_path: str):
+        """Yield cleaned page texts in order using the PDFium (C) backend.
+        
+        Each page and its text page are closed as soon as they are read, so
+        only one page is held in native memory at a time.
+        """
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_range()
+                finally:
+                    textpage.close()
+                    page.close()
+                # PDFium ends lines with "\r\n"; the cleaners work on "\n"
+                yield self._clean_spaced_text(text.replace("\r\n", "\n"))
+        finally:
+            pdf.close()
+    
+    def _iter_pdf_pages(self, file_path: str, reader: PdfReader):
+        """Yield cleaned page texts in order, extracting large PDFs in a process pool."""
+        page_count = len(reader.pages)
+        workers = min(os.cpu_count() or 1, page_count)
+        # Below the threshold pool startup would dominate
+        if page_count < self.config.pdf_parallel_threshold or workers < 2:
+            for page in reader.pages:
+                # Clean up spaced-out characters (e.g., "A s s i g n m e n t" → "Assignment")
+                yield self._clean_spaced_text(page.extract_text() or "")
+            return
         
-        # Remove front matter (TOC, title pages, etc.) before returning
-        return self._remove_front_matter(cleaned_text)
+        # pypdf extraction is pure Python, so threads wouldn't help. Spawn (not
+        # fork) because the server process is multi-threaded.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pdf_worker,
+            initargs=(file_path,),
+        ) as pool:
+            batch_size = _pool_batch_size(page_count)
+            logger.info(f"Extracting {page_count} pages with {workers} workers, batch size {batch_size}")
+            yield from pool.map(_extract_one_page, range(page_count), chunksize=batch_size)
     
     @staticmethod
     def _clean_spaced_text(text: str) -> str:
@@ -180,22 +591,24 @@ class DocumentProcessor:
         
         This handles PDFs with poor text extraction.
         """
-        import re
-        
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            # Check if line has the pattern of single chars separated by spaces
-            # Pattern: single letter/number, space, repeat
-            if re.match(r'^(\w\s){4,}', line):  # At least 4 spaced characters
-                # Remove all single spaces between single characters
-                cleaned = re.sub(r'(\w)\s+(?=\w\s|\w$)', r'\1', line)
-                cleaned_lines.append(cleaned)
-            else:
-                cleaned_lines.append(line)
-        
-        return '\n'.join(cleaned_lines)
+        # Find lines with the pattern of single chars separated by spaces
+        # (single letter/number, space, repeat) and splice in fixed copies;
+        # everything between them is copied over as-is
+        parts = []
+        pos = 0
+        m = _SPACED_FIRST_LINE_RE.match(text)
+        if m:
+            parts.append(_SPACED_FIX_RE.sub('', m.group()))
+            pos = m.end()
+        for m in _SPACED_LINE_RE.finditer(text, pos):
+            parts.append(text[pos:m.start(1)])
+            # Remove all single spaces between single characters
+            parts.append(_SPACED_FIX_RE.sub('', m.group(1)))
+            pos = m.end()
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return ''.join(parts)
     
     def _extract_txt_text(self, file_path: str) -> str:
         """Extract text from plain text file."""
@@ -211,31 +624,17 @@ class DocumentProcessor:
         Captures paragraphs and table cell text. DOCX has no stable page concept,
         so page markers are not added.
         """
-        try:
-            from docx import Document  # type: ignore
-        except Exception as e:
-            raise NotImplementedError(
-                "DOCX support requires python-docx. Install with: pip install python-docx"
-            ) from e
-
-        doc = Document(file_path)
-        parts: List[str] = []
-
-        # Paragraphs
-        for para in doc.paragraphs:
-            text = (para.text or "").strip()
-            if text:
-                parts.append(text)
-
-        # Tables
-        for table in doc.tables:
-            for row in table.rows:
-                cells = [(cell.text or "").strip() for cell in row.cells]
-                line = " | ".join([c for c in cells if c])
-                if line:
-                    parts.append(line)
-
-        raw_text = "\n".join(parts)
+        doc = _docx_document_class()(file_path)
+
+        # Paragraphs, then one " | "-joined line per table row
+        paragraphs = (text for para in doc.paragraphs if (text := (para.text or "").strip()))
+        rows = (
+            line
+            for table in doc.tables
+            for tr in table._tbl.tr_lst
+            if (line := " | ".join([c for text in _docx_row_cell_texts(tr, table) if (c := (text or "").strip())]))
+        )
+        raw_text = "\n".join(itertools.chain(paragraphs, rows))
         
         # Remove front matter from DOCX files too
         return self._remove_front_matter(raw_text)
@@ -247,143 +646,168 @@ class DocumentProcessor:
         
         This is applied to ALL document types (PDF, TXT, DOCX) during extraction.
         """
-        import re
-        
-        lines = text.split('\n')
+        offset = self._front_matter_end(text)
+        return text[offset:] if offset else text
+    
+    def _front_matter_end(self, text: str) -> int:
+        """Character offset where the content after the front matter starts (0 if not found)."""
         content_start_idx = 0
+        content_start = 0  # character offset of line content_start_idx
         
         # Strategy 1: Find "Chapter 1" or "1 INTRODUCTION" or "CHAPTER 1"
-        for i, line in enumerate(lines):
-            line_upper = line.strip().upper()
+        # One scan over the whole text finds candidate lines; each is then
+        # checked against the exact per-line rules.
+        for m in _CONTENT_ANCHOR_RE.finditer(text):
+            line_start = m.start()
+            line = text[line_start:_line_end(text, line_start)]
+            line_stripped = line.strip()
+            i = text.count('\n', 0, line_start)
             # Match patterns like: "CHAPTER 1", "1 INTRODUCTION", "Chapter 1:", etc.
-            if re.match(r'^(CHAPTER\s+1|1[\s.:]+INTRODUCTION|CHAPTER\s+ONE)', line_upper):
-                content_start_idx = i
+            if _CHAPTER_RE.match(line_stripped.upper()):
+                content_start_idx, content_start = i, line_start
                 logger.info(f"Found content start at line {i}: '{line[:50]}'")
                 break
             # Also catch numbered sections like "1.0" or "1.1"
-            if re.match(r'^1\.[0-9]', line.strip()) and len(line.strip()) > 5:
-                content_start_idx = i
+            if _SECTION_RE.match(line_stripped) and len(line_stripped) > 5:
+                content_start_idx, content_start = i, line_start
                 logger.info(f"Found content start (section 1.x) at line {i}: '{line[:50]}'")
                 break
         
         # Strategy 2: If no chapter found, skip obvious front matter sections
         if content_start_idx == 0:
-            skip_keywords = [
-                'TABLE OF CONTENTS', 'CONTENTS', 'LIST OF FIGURES', 'LIST OF TABLES',
-                'PLAGIARISM', 'CERTIFICATE', 'DECLARATION', 'ACKNOWLEDGEMENT',
-                'DEDICATION', 'APPROVAL', 'ABSTRACT'
-            ]
-            
-            in_front_matter = True
-            for i, line in enumerate(lines):
-                line_upper = line.strip().upper()
+            # Only lines longer than 100 characters can qualify
+            for m in _LONG_LINE_RE.finditer(text):
+                line = m.group()
                 
-                # Check if we're still in front matter section
-                if any(keyword in line_upper for keyword in skip_keywords):
-                    in_front_matter = True
+                # Still in front matter section
+                if line.isascii():
+                    if _FRONT_MATTER_KEYWORDS_RE.search(line):
+                        continue
+                elif any(keyword in line.upper() for keyword in _FRONT_MATTER_KEYWORDS):
                     continue
                 
                 # If we find substantial content (long paragraph), assume front matter ended
-                if in_front_matter and len(line.strip()) > 100 and not re.search(r'\.(\s*\.){2,}', line):
+                if len(line.strip()) > 100 and not _TOC_DOTS_RE.search(line):
                     # This looks like real content (long line, no TOC dots)
+                    i = text.count('\n', 0, m.start())
                     content_start_idx = max(0, i - 2)  # Include a bit before
+                    content_start = _line_start_before(text, m.start(), i - content_start_idx)
                     logger.info(f"Detected content start via paragraph at line {i}")
                     break
         
         # Strategy 3: Skip TOC entries (lines with multiple dots and page numbers)
         if content_start_idx == 0:
-            for i, line in enumerate(lines):
-                # If we see 5+ consecutive lines without TOC patterns, assume content started
-                if i > 20:  # Give at least 20 lines for front matter
-                    toc_count = 0
-                    for j in range(max(0, i-5), i):
-                        if re.search(r'\.(\s*\.){2,}|\d+$', lines[j]):
-                            toc_count += 1
-                    
-                    if toc_count == 0:  # No TOC patterns in last 5 lines
-                        content_start_idx = max(0, i - 5)
-                        logger.info(f"Detected content start via TOC absence at line {i}")
-                        break
+            # If we see 5+ consecutive lines without TOC patterns after the
+            # first 20 lines, assume content started at the first of them
+            line_count = text.count('\n') + 1
+            candidate = 16  # first run start with its successor line past line 20
+            line_no, pos = 0, 0
+            for m in _TOC_MARK_RE.finditer(text):
+                line_no += text.count('\n', pos, m.start())
+                pos = m.start()
+                if line_no - candidate >= 5:
+                    break  # clean run found before this TOC line
+                if line_no >= candidate:
+                    candidate = line_no + 1
+            if candidate + 5 < line_count:
+                content_start_idx = candidate
+                content_start = _nth_line_start(text, candidate)
+                logger.info(f"Detected content start via TOC absence at line {candidate + 5}")
         
         # If we found a content start, trim everything before it
         if content_start_idx > 0:
             skipped_lines = content_start_idx
-            content = '\n'.join(lines[content_start_idx:])
-            logger.info(f"Removed {skipped_lines} lines of front matter. Remaining: {len(content)} chars")
-            return content
+            logger.info(f"Removed {skipped_lines} lines of front matter. Remaining: {len(text) - content_start} chars")
+            return content_start
         
         # Fallback: return original if we couldn't detect front matter
         logger.warning("Could not detect front matter boundaries, returning full text")
-        return text
+        return 0
     
     def _save_metadata(self, metadata: DocumentMetadata) -> None:
-        """Save document metadata to JSON file."""
+        """Save document metadata to the index and its JSON export."""
+        metadata_dict = _metadata_to_dict(metadata)
+        with self._db_lock:
+            self._db.execute(_INSERT_METADATA_SQL, tuple(metadata_dict[c] for c in _METADATA_COLUMNS))
+        self._write_metadata_json(metadata_dict)
+    
+    def _write_metadata_json(self, metadata_dict: Dict) -> None:
+        """Queue the per-document JSON copy (kept as a readable backup/export).
+        
+        The SQLite index is the source of truth and is updated synchronously;
+        only this export is deferred to the background writer.
+        """
+        self._export_pool.submit(self._write_metadata_json_now, metadata_dict)
+    
+    def _write_metadata_json_now(self, metadata_dict: Dict) -> None:
         metadata_path = os.path.join(
             self.config.metadata_folder, 
-            f"{metadata.document_id}.json"
+            f"{metadata_dict['document_id']}.json"
         )
+        # Write-then-rename so readers never see a partial file
+        tmp_path = f"{metadata_path}.tmp"
+        try:
+            if ORJSON_AVAILABLE:
+                with open(tmp_path, 'wb') as f:
+                    f.write(orjson.dumps(metadata_dict, option=orjson.OPT_INDENT_2))
+            else:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(metadata_dict, f, indent=2)
+            os.replace(tmp_path, metadata_path)
+        except Exception as e:
+            _remove_if_exists(tmp_path)
+            logger.error(f"Failed to write metadata export for {metadata_dict['document_id']}: {str(e)}")
+    
+    def flush_metadata_exports(self) -> None:
+        """Block until all queued JSON exports have been written."""
+        self._export_pool.submit(lambda: None).result()
+    
+    def update_metadata(self, document_id: str, **fields) -> bool:
+        """Update stored metadata fields (e.g. chunk_count) for a document.
         
-        # Convert dataclass to dict for JSON serialization
-        metadata_dict = {
-            'document_id': metadata.document_id,
-            'filename': metadata.filename,
-            'file_size': metadata.file_size,
-            'file_type': metadata.file_type,
-            'upload_time': metadata.upload_time.isoformat(),
-            'processed_time': metadata.processed_time.isoformat() if metadata.processed_time else None,
-            'text_length': metadata.text_length,
-            'page_count': metadata.page_count,
-            'chunk_count': metadata.chunk_count,
-            'status': metadata.status
-        }
-        
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata_dict, f, indent=2)
+        Returns:
+            True if the document exists
+        """
+        unknown = set(fields) - set(_METADATA_COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Unknown metadata fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return self.get_document_metadata(document_id) is not None
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._db_lock:
+            cursor = self._db.execute(
+                f"UPDATE documents SET {assignments} WHERE document_id = ?",
+                (*fields.values(), document_id),
+            )
+        if not cursor.rowcount:
+            return False
+        metadata = self.get_document_metadata(document_id)
+        if metadata:
+            self._write_metadata_json(_metadata_to_dict(metadata))
+        return True
     
     def get_document_metadata(self, document_id: str) -> Optional[DocumentMetadata]:
         """Load document metadata by ID."""
-        metadata_path = os.path.join(self.config.metadata_folder, f"{document_id}.json")
-        
-        if not os.path.exists(metadata_path):
-            return None
-        
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            return DocumentMetadata(
-                document_id=data['document_id'],
-                filename=data['filename'],
-                file_size=data['file_size'],
-                file_type=data['file_type'],
-                upload_time=datetime.fromisoformat(data['upload_time']),
-                processed_time=datetime.fromisoformat(data['processed_time']) if data['processed_time'] else None,
-                text_length=data['text_length'],
-                page_count=data['page_count'],
-                chunk_count=data['chunk_count'],
-                status=data['status']
-            )
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT * FROM documents WHERE document_id = ?", (document_id,)
+                ).fetchone()
+            return _metadata_from_row(row) if row else None
         except Exception as e:
             logger.error(f"Failed to load metadata for {document_id}: {str(e)}")
             return None
     
+    def metadata_version(self) -> int:
+        """Counter that changes when another connection, e.g. another server worker, commits to the index."""
+        with self._db_lock:
+            return self._db.execute("PRAGMA data_version").fetchone()[0]
+    
     def list_documents(self) -> List[DocumentMetadata]:
-        """List all processed documents."""
-        documents = []
-        
-        if not os.path.exists(self.config.metadata_folder):
-            return documents
-        
-        for filename in os.listdir(self.config.metadata_folder):
-            if filename.endswith('.json'):
-                doc_id = filename[:-5]  # Remove .json extension
-                metadata = self.get_document_metadata(doc_id)
-                if metadata:
-                    documents.append(metadata)
-        
-        # Sort by upload time (newest first)
-        documents.sort(key=lambda x: x.upload_time, reverse=True)
-        return documents
+        """List all processed documents (newest first)."""
+        with self._db_lock:
+            rows = self._db.execute("SELECT * FROM documents ORDER BY upload_time DESC").fetchall()
+        return [_metadata_from_row(row) for row in rows]
     
     def delete_document(self, document_id: str) -> Tuple[bool, str]:
         """Delete document and all associated files."""
@@ -396,12 +820,18 @@ class DocumentProcessor:
             files_to_delete = [
                 os.path.join(self.config.upload_folder, f"{document_id}.{metadata.file_type}"),
                 os.path.join(self.config.processed_folder, f"{document_id}.txt"),
-                os.path.join(self.config.metadata_folder, f"{document_id}.json")
             ]
             
             for file_path in files_to_delete:
                 if os.path.exists(file_path):
                     os.remove(file_path)
+            with self._db_lock:
+                self._db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            # Queued behind any pending export of this document, and waited
+            # for so the JSON is gone when the call returns
+            self._export_pool.submit(
+                _remove_if_exists, os.path.join(self.config.metadata_folder, f"{document_id}.json")
+            ).result()
             
             logger.info(f"Successfully deleted document: {document_id}")
             return True, "Document deleted successfully"
@@ -0,0 +1,27 @@
+"""
+Fast Request ID Generation
+
+Pools randomness from os.urandom so per-request IDs don't each pay a
+syscall. Each thread keeps its own pool, so no locking is required.
+"""
+
+import os
+import binascii
+import threading
+
+
+_POOL_SIZE = 4096  # bytes; yields 256 IDs per refill
+_ID_BYTES = 16
+
+_local = threading.local()
+
+
+def new_request_id() -> str:
+    """Return a random 32-char hex ID (128 bits, no dashes)."""
+    buf = getattr(_local, "buf", None)
+    off = getattr(_local, "off", _POOL_SIZE)
+    if buf is None or off >= _POOL_SIZE:
+        buf = _local.buf = os.urandom(_POOL_SIZE)
+        off = 0
+    _local.off = off + _ID_BYTES
+    return binascii.hexlify(buf[off:off + _ID_BYTES]).decode()
@@ -0,0 +1,109 @@
+"""
+Chunk Quality Module
+
+Heuristics for spotting low-quality chunks (tables of contents, headers,
+metadata) that make poor context for answers.
+"""
+
+import functools
+import logging
+import re
+
+
+logger = logging.getLogger(__name__)
+
+# Table-of-contents / low-content patterns used by is_low_quality_chunk
+_TOC_DOTS_RE = re.compile(r'\.(\s*\.){2,}')  # ". . ." or "....."
+_TOC_NUMBERED_PAGE_RE = re.compile(r'^[\d.]+\s+[A-Z].*[\s.]+\d+$')
+_TOC_SECTION_RE = re.compile(r'^[\d.]{3,}\s+[A-Z]')
+_TOC_PAGE_ONLY_RE = re.compile(r'^[\s.\d]*\d+$')
+_TOC_KEYWORDS_RE = re.compile(
+    r'\b(Table of Contents|List of Figures|List of Tables|CONTENTS|Chapter \d+)\b', re.IGNORECASE
+)
+_WORD_RE = re.compile(r'\b[a-zA-Z]{3,}\b')
+# Line starts (after stripping) where a numbered/page-only TOC pattern can match
+_NUMERIC_LINE_START_RE = re.compile(r'\n[^\S\n]*[.\d]')
+
+
+def _toc_indicator_bound(body: str) -> int:
+    """Cheap upper bound on the TOC indicator score of a stripped chunk.
+
+    A dots line needs three '.', the three numbered/page patterns need the
+    line to start with a digit or '.', and each keyword hit contains one of
+    'contents', 'list of' or 'chapter'. Counting those over the whole text
+    runs at C speed and never undercounts.
+    """
+    numeric_starts = len(_NUMERIC_LINE_START_RE.findall(body)) + (body[:1] == '.' or body[:1].isdecimal())
+    if body.isascii():
+        lowered = body.lower()
+        keyword_hits = lowered.count('contents') + lowered.count('list of') + lowered.count('chapter')
+    else:
+        # Unicode case folding can match more than lower() would
+        keyword_hits = len(_TOC_KEYWORDS_RE.findall(body))
+    return body.count('.') // 3 + 3 * numeric_starts + 2 * keyword_hits
+
+
+@functools.lru_cache(maxsize=8192)
+def is_low_quality_chunk(text: str) -> bool:
+    """
+    Detect low-quality chunks like table of contents, headers, or metadata.
+    
+    Verdicts are memoized by text, since the same chunks come back
+    across queries against the same index.
+    
+    Args:
+        text: Chunk text to evaluate
+        
+    Returns:
+        True if chunk appears to be low quality
+    """
+    if not text or len(text.strip()) < 20:
+        return True
+    
+    body = text.strip()
+    lines = body.split('\n')
+    
+    # Check if it looks like a table of contents; most prose can't reach
+    # the threshold at all, so only scan lines when the bound allows it
+    toc_indicators = 0
+    if _toc_indicator_bound(body) / len(lines) > 0.25:
+        for line in lines:
+            line_stripped = line.strip()
+            
+            # TOC patterns - multiple consecutive dots (with or without spaces)
+            if _TOC_DOTS_RE.search(line_stripped):  # ". . ." or "....."
+                toc_indicators += 1
+            
+            # Section numbering with title and page number: "1.1 Title . . . 3"
+            if _TOC_NUMBERED_PAGE_RE.search(line_stripped):
+                toc_indicators += 1
+            
+            # Just section number and title: "2.1.1 Brief overview of Machine Learning"
+            if _TOC_SECTION_RE.match(line_stripped):
+                toc_indicators += 1
+            
+            # Lines that are mostly whitespace/dots and end in page numbers
+            if _TOC_PAGE_ONLY_RE.match(line_stripped) and len(line_stripped) < 100:
+                toc_indicators += 1
+            
+            # Common TOC keywords
+            if _TOC_KEYWORDS_RE.search(line_stripped):
+                toc_indicators += 2  # Strong indicator
+    
+    # Lower threshold to 25% to be more aggressive
+    if len(lines) > 0 and toc_indicators / len(lines) > 0.25:
+        logger.debug(f"Filtered TOC-like chunk ({toc_indicators}/{len(lines)} indicators): {text[:100]}...")
+        return True
+    
+    # Check if it's just section headers or minimal content
+    if len(lines) <= 3 and all(len(line.strip()) < 50 for line in lines):
+        return True
+    
+    # Additional check: if chunk has very low word density (lots of dots/numbers vs words)
+    # Less than 30% word density: words / (chars / 6) < 0.3, i.e. 20 * words < chars
+    char_count = len(text)
+    if char_count > 50 and 20 * len(_WORD_RE.findall(text)) < char_count:
+        logger.debug(f"Filtered low word-density chunk: {text[:100]}...")
+        return True
+    
+    return False
@@ -4,8 +4,10 @@ Response Generator Module
 Handles LLM integration and response generation with source citations.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+import hashlib
 import logging
+import threading
 import time
 
 try:
@@ -22,11 +24,84 @@ except ImportError:
     GEMINI_AVAILABLE = False
     logging.warning("Gemini library not available. Install with: pip install google-generativeai")
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from cachetools import LRUCache
+
 from .config import RAGConfig
 
 
 logger = logging.getLogger(__name__)
 
+# LLM clients shared by every ResponseGenerator in the process, keyed by
+# their settings, so connection pools (and TLS sessions) outlive instances
+_CLIENTS: Dict[Tuple, Any] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+# Completions for deterministic (temperature 0) requests, keyed by a digest of
+# provider, model and both prompts. LRUCache is not thread-safe; guard it.
+_RESPONSE_CACHE: Optional[LRUCache] = None
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+
+def _response_cache(maxsize: int) -> LRUCache:
+    global _RESPONSE_CACHE
+    if _RESPONSE_CACHE is None or _RESPONSE_CACHE.maxsize != maxsize:
+        _RESPONSE_CACHE = LRUCache(maxsize=maxsize)
+    return _RESPONSE_CACHE
+
+
+def _gemini_text(resp) -> str:
+    """Answer text of a Gemini response (or streamed chunk)."""
+    try:
+        if getattr(resp, 'text', None) is not None:
+            return resp.text
+    except ValueError:
+        # .text raises when the response has no simple text part
+        pass
+    if getattr(resp, 'candidates', None):
+        # Fallback: concatenate parts
+        parts = []
+        for cand in resp.candidates:
+            if getattr(cand, 'content', None) and getattr(cand.content, 'parts', None):
+                for part in cand.content.parts:
+                    parts.append(getattr(part, 'text', '') or '')
+        return "\n".join([p for p in parts if p])
+    return ""
+
+
+def _openai_client(api_key: str, timeout: float, max_retries: int):
+    key = ("openai", api_key, timeout, max_retries)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            import httpx
+            http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_keepalive_connections=20),
+                timeout=timeout,
+            )
+            client = openai.OpenAI(
+                api_key=api_key, http_client=http_client, timeout=timeout, max_retries=max_retries
+            )
+            _CLIENTS[key] = client
+        return client
+
+
+def _gemini_model(api_key: str, model_name: str):
+    key = ("gemini", api_key, model_name)
+    with _CLIENTS_LOCK:
+        model = _CLIENTS.get(key)
+        if model is None:
+            genai.configure(api_key=api_key)
+            model = _CLIENTS[key] = genai.GenerativeModel(model_name)
+        return model
+
 
 class ResponseGenerator:
     """Generates AI responses using retrieved context."""
@@ -51,7 +126,9 @@ class ResponseGenerator:
             return
         
         try:
-            self.client = openai.OpenAI(api_key=self.config.openai_api_key)
+            self.client = _openai_client(
+                self.config.openai_api_key, self.config.llm_timeout, self.config.llm_max_retries
+            )
             logger.info("OpenAI client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI client: {str(e)}")
@@ -65,10 +142,9 @@ class ResponseGenerator:
             logger.warning("GEMINI_API_KEY not configured. Responses will be rule-based.")
             return
         try:
-            genai.configure(api_key=self.config.gemini_api_key)
             # default_model may contain a Gemini model name like 'gemini-1.5-flash'
             model_name = self.config.default_model or "gemini-1.5-flash"
-            self.gemini_model = genai.GenerativeModel(model_name)
+            self.gemini_model = _gemini_model(self.config.gemini_api_key, model_name)
             logger.info("Gemini client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {str(e)}")
@@ -120,12 +196,51 @@ class ResponseGenerator:
                 }
             }
     
+    def _cached_completion(
+        self, provider: str, system_prompt: str, user_prompt: str,
+        call: Callable[[], Tuple[str, int]],
+    ) -> Tuple[str, int, bool]:
+        """Run ``call`` unless an identical deterministic request was already answered.
+
+        Only temperature-0 requests are cached; anything else may legitimately
+        differ between calls. Returns (answer, tokens_used, cache_hit).
+        """
+        key = self._cache_key(provider, system_prompt, user_prompt)
+        hit = self._cache_get(key)
+        if hit is not None:
+            return hit[0], hit[1], True
+
+        answer, tokens = call()
+        self._cache_put(key, answer, tokens)
+        return answer, tokens, False
+
+    def _cache_key(self, provider: str, system_prompt: str, user_prompt: str) -> Optional[bytes]:
+        """Cache key for a request, or None when the request must not be cached."""
+        if self.config.llm_cache_size <= 0 or self.config.temperature != 0:
+            return None
+        return hashlib.sha256("\x00".join((
+            provider, self.config.default_model or "", str(self.config.max_tokens),
+            system_prompt, user_prompt,
+        )).encode("utf-8")).digest()
+
+    def _cache_get(self, key: Optional[bytes]) -> Optional[Tuple[str, int]]:
+        if key is None:
+            return None
+        with _RESPONSE_CACHE_LOCK:
+            return _response_cache(self.config.llm_cache_size).get(key)
+
+    def _cache_put(self, key: Optional[bytes], answer: str, tokens: int) -> None:
+        # An empty answer (e.g. a blocked Gemini candidate) is not worth replaying
+        if key is not None and answer:
+            with _RESPONSE_CACHE_LOCK:
+                _response_cache(self.config.llm_cache_size)[key] = (answer, tokens)
+
     def _generate_ai_response(self, query: str, context: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate response using OpenAI."""
         system_prompt = self._create_system_prompt()
         user_prompt = self._create_user_prompt(query, context)
-        
-        try:
+
+        def call() -> Tuple[str, int]:
             response = self.client.chat.completions.create(
                 model=self.config.default_model,
                 messages=[
@@ -135,13 +250,17 @@ class ResponseGenerator:
                 max_tokens=self.config.max_tokens,
                 temperature=self.config.temperature
             )
-            
-            answer = response.choices[0].message.content
-            tokens_used = response.usage.total_tokens
+            return response.choices[0].message.content, response.usage.total_tokens
+        
+        # Sources are known up front; format them before the (slow) API call
+        references = self._format_source_references(sources)
+
+        try:
+            answer, tokens_used, cached = self._cached_completion("openai", system_prompt, user_prompt, call)
             
             # Add source references to answer if sources exist
-            if sources:
-                answer += self._format_source_references(sources)
+            if references:
+                answer += references
             
             return {
                 'answer': answer,
@@ -150,7 +269,8 @@ class ResponseGenerator:
                     'model': self.config.default_model,
                     'tokens_used': tokens_used,
                     'has_sources': len(sources) > 0,
-                    'context_length': len(context)
+                    'context_length': len(context),
+                    'cached': cached
                 }
             }
             
@@ -161,24 +281,22 @@ class ResponseGenerator:
 
     def _generate_gemini_response(self, query: str, context: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate response using Gemini."""
-        try:
-            prompt = self._create_system_prompt() + "\n\n" + self._create_user_prompt(query, context)
-            resp = self.gemini_model.generate_content(prompt)
-            # Handle streaming or non-streaming responses
-            answer = ""
-            if hasattr(resp, 'text') and resp.text is not None:
-                answer = resp.text
-            elif hasattr(resp, 'candidates') and resp.candidates:
-                # Fallback: concatenate parts
-                parts = []
-                for cand in resp.candidates:
-                    if getattr(cand, 'content', None) and getattr(cand.content, 'parts', None):
-                        for part in cand.content.parts:
-                            parts.append(getattr(part, 'text', '') or '')
-                answer = "\n".join([p for p in parts if p])
+        system_prompt = self._create_system_prompt()
+        user_prompt = self._create_user_prompt(query, context)
 
-            if sources:
-                answer += self._format_source_references(sources)
+        def call() -> Tuple[str, int]:
+            resp = self.gemini_model.generate_content(
+                system_prompt + "\n\n" + user_prompt,
+                generation_config=self._gemini_generation_config(),
+                request_options={"timeout": self.config.llm_timeout}
+            )
+            return _gemini_text(resp), 0  # google-generativeai doesn't expose tokens consistently
+
+        references = self._format_source_references(sources)
+
+        try:
+            answer, _, cached = self._cached_completion("gemini", system_prompt, user_prompt, call)
+            answer += references
 
             return {
                 'answer': answer or "",
@@ -187,13 +305,129 @@ class ResponseGenerator:
                     'model': self.config.default_model or 'gemini-1.5-flash',
                     'tokens_used': 0,  # google-generativeai doesn't expose tokens consistently
                     'has_sources': len(sources) > 0,
-                    'context_length': len(context)
+                    'context_length': len(context),
+                    'cached': cached
                 }
             }
         except Exception as e:
             logger.error(f"Gemini API call failed: {str(e)}")
             return self._generate_fallback_response(query, context, sources)
     
+    def stream_response(self, query: str, context: str, sources: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a response as it is generated.
+
+        Yields ``{'delta': str}`` events carrying answer text, then one final
+        ``{'done': True, 'sources': [...], 'meta': {...}}`` event. The meta
+        matches generate_response and adds ``first_token_ms``. Without an
+        LLM (or context) the whole rule-based answer arrives as one delta.
+        """
+        start_time = time.time()
+        provider = (self.config.llm_provider or "openai").lower()
+        use_openai = self.client is not None and provider == "openai"
+        use_gemini = self.gemini_model is not None and provider == "gemini"
+
+        if not ((use_openai or use_gemini) and context.strip()):
+            buffered = self.generate_response(query, context, sources)
+            yield {'delta': buffered['answer']}
+            buffered['meta']['first_token_ms'] = buffered['meta']['generation_time_ms']
+            yield {'done': True, 'sources': buffered['sources'], 'meta': buffered['meta']}
+            return
+
+        system_prompt = self._create_system_prompt()
+        user_prompt = self._create_user_prompt(query, context)
+        references = self._format_source_references(sources)
+        key = self._cache_key(provider, system_prompt, user_prompt)
+        hit = self._cache_get(key)
+        first_token_ms = None
+        parts: List[str] = []
+        tokens_used = 0
+        error = None
+
+        if hit is not None:
+            parts.append(hit[0])
+            tokens_used = hit[1]
+            first_token_ms = int((time.time() - start_time) * 1000)
+            yield {'delta': hit[0]}
+        else:
+            try:
+                deltas = self._stream_gemini(system_prompt, user_prompt) if use_gemini \
+                    else self._stream_openai(system_prompt, user_prompt)
+                for delta, usage in deltas:
+                    if usage:
+                        tokens_used = usage
+                    if not delta:
+                        continue
+                    if first_token_ms is None:
+                        first_token_ms = int((time.time() - start_time) * 1000)
+                    parts.append(delta)
+                    yield {'delta': delta}
+            except Exception as e:
+                logger.error(f"Streaming LLM call failed: {str(e)}")
+                error = str(e)
+
+            if error is None:
+                self._cache_put(key, "".join(parts), tokens_used)
+            elif not parts:
+                # Nothing was sent yet, so the rule-based answer can stand in cleanly
+                fallback = self._generate_fallback_response(query, context, sources)
+                first_token_ms = int((time.time() - start_time) * 1000)
+                yield {'delta': fallback['answer']}
+                fallback['meta']['generation_time_ms'] = first_token_ms
+                fallback['meta']['first_token_ms'] = first_token_ms
+                yield {'done': True, 'sources': sources, 'meta': fallback['meta']}
+                return
+
+        if references:
+            yield {'delta': references}
+
+        meta = {
+            'model': self.config.default_model or ('gemini-1.5-flash' if use_gemini else None),
+            'tokens_used': tokens_used,
+            'has_sources': len(sources) > 0,
+            'context_length': len(context),
+            'cached': hit is not None,
+            'first_token_ms': first_token_ms,
+            'generation_time_ms': int((time.time() - start_time) * 1000),
+        }
+        if error is not None:
+            meta['error'] = error
+        yield {'done': True, 'sources': sources, 'meta': meta}
+
+    def _gemini_generation_config(self) -> Dict[str, Any]:
+        """Sampling settings for Gemini, matching the OpenAI calls (and the cache key)."""
+        return {"temperature": self.config.temperature, "max_output_tokens": self.config.max_tokens}
+
+    def _stream_openai(self, system_prompt: str, user_prompt: str) -> Iterator[Tuple[str, int]]:
+        """Yield (text delta, total tokens or 0) pairs from a streamed OpenAI completion."""
+        stream = self.client.chat.completions.create(
+            model=self.config.default_model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=self.config.max_tokens,
+            temperature=self.config.temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for event in stream:
+            # The usage-only event at the end carries no choices
+            delta = event.choices[0].delta.content if event.choices else None
+            usage = event.usage.total_tokens if getattr(event, 'usage', None) else 0
+            yield delta or "", usage
+
+    def _stream_gemini(self, system_prompt: str, user_prompt: str) -> Iterator[Tuple[str, int]]:
+        """Yield (text delta, 0) pairs from a streamed Gemini generation."""
+        stream = self.gemini_model.generate_content(
+            system_prompt + "\n\n" + user_prompt,
+            stream=True,
+            generation_config=self._gemini_generation_config(),
+            request_options={"timeout": self.config.llm_timeout}
+        )
+        for chunk in stream:
+            yield _gemini_text(chunk), 0
+
     def _generate_fallback_response(self, query: str, context: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate rule-based response when AI is not available."""
         if context.strip():
@@ -258,34 +492,24 @@ Please answer the question based on the context provided above."""
         if not sources:
             return ""
         
-        references = "\n\n---\n**Sources:**\n"
-        
-        # Group sources by document
-        by_document = {}
+        # Group page numbers by document, keeping first-seen document order
+        by_document: Dict[Any, set] = {}
         for source in sources:
-            doc_id = source.get('document_id', 'unknown')
-            if doc_id not in by_document:
-                by_document[doc_id] = []
-            by_document[doc_id].append(source)
+            pages = by_document.setdefault(source.get('document_id', 'unknown'), set())
+            page = source.get('page', 1)
+            if page:
+                pages.add(page)
         
-        for doc_id, doc_sources in by_document.items():
-            references += f"• **{doc_id}** "
-            
-            pages = set()
-            for source in doc_sources:
-                page = source.get('page', 1)
-                if page:
-                    pages.add(page)
-            
-            if pages:
-                if len(pages) == 1:
-                    references += f"(page {list(pages)[0]})"
-                else:
-                    references += f"(pages {', '.join(map(str, sorted(pages)))})"
-            
-            references += "\n"
+        lines = ["\n\n---\n**Sources:**\n"]
+        for doc_id, pages in by_document.items():
+            if not pages:
+                lines.append(f"• **{doc_id}** \n")
+            elif len(pages) == 1:
+                lines.append(f"• **{doc_id}** (page {next(iter(pages))})\n")
+            else:
+                lines.append(f"• **{doc_id}** (pages {', '.join(map(str, sorted(pages)))})\n")
         
-        return references
+        return "".join(lines)
     
     def test_connection(self) -> Dict[str, Any]:
         """Test OpenAI connection and return status."""
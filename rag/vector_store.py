@@ -7,18 +7,224 @@ and similarity search operations.
 
 import os
 import json
+import hashlib
 import pickle
+import threading
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 
 import numpy as np
 import faiss
+from cachetools import LRUCache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 from .config import RAGConfig
+from .chunking import Chunk
+from .quality import is_low_quality_chunk
 
 
 logger = logging.getLogger(__name__)
 
+# Scalar quantizer per config.vector_quantization (fp32 stores vectors as-is)
+_SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,  # per-dimension ranges learned from the data
+}
+
+# int8 ranges are fixed at training time, so an int8 store keeps exact fp32
+# vectors until it has this many to learn from, then retrains whenever it has
+# grown _SQ_RETRAIN_GROWTH times past the set it last trained on
+_SQ_MIN_TRAIN = 1024
+_SQ_RETRAIN_GROWTH = 4
+# Document-scoped HNSW searches score documents of up to this many x efSearch
+# chunks exactly rather than through the filtered graph walk
+_HNSW_EXACT_SCAN_FACTOR = 4
+
+
+def _index_layout(index: faiss.Index) -> Tuple[str, str]:
+    """(index_type, vector_quantization) that an index was built with."""
+    hnsw = isinstance(index, faiss.IndexHNSW)
+    storage = faiss.downcast_index(index.storage) if hnsw else index
+    quantization = "fp32"
+    if isinstance(storage, faiss.IndexScalarQuantizer):
+        quantization = next((name for name, qtype in _SQ_TYPES.items() if qtype == storage.sq.qtype), "other")
+    return ("hnsw" if hnsw else "flat"), quantization
+
+
+class _StoreLock:
+    """Exclusive lock on a file in the store directory, shared by every process using it.
+    
+    Not reentrant: acquire() while held is a no-op that returns False.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+    
+    def acquire(self) -> bool:
+        """Block until the lock is held; True if this call took it."""
+        if self._file is not None:
+            return False
+        f = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK gives up after ~10 s; keep waiting
+        except BaseException:
+            f.close()
+            raise
+        self._file = f
+        return True
+    
+    def release(self) -> None:
+        if self._file is None:
+            return
+        f, self._file = self._file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+
+
+def _write_replacing(path: str, write) -> None:
+    """Write a file via a temp file and os.replace. Readers never see it half-written,
+    and other processes that memory-mapped the old file keep a valid mapping."""
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_npy(path: str, values: np.ndarray) -> None:
+    with open(path, 'wb') as f:
+        np.save(f, values)
+
+
+@dataclass
+class _ChunkTable:
+    """Stored chunk records, one column per field; row i describes FAISS position i.
+    
+    The id, page and flag columns are numpy arrays saved as .npy files and
+    memory-mapped on load, so scoping to a document is a single vectorized
+    comparison. Texts are kept as a plain list (one JSON file on disk).
+    """
+    document_ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=str))
+    chunk_ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=str))
+    pages: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    chunk_indices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    low_quality: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+    texts: List[str] = field(default_factory=list)
+    
+    # Column -> file in the vector store directory
+    _ARRAY_FILES = {
+        'document_ids': "chunk_document_ids.npy",
+        'chunk_ids': "chunk_ids.npy",
+        'pages': "chunk_pages.npy",
+        'chunk_indices': "chunk_indices.npy",
+        'low_quality': "chunk_low_quality.npy",
+    }
+    _TEXTS_FILE = "chunk_texts.json"
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    @classmethod
+    def from_chunks(cls, chunks: List[Chunk], low_quality: List[bool]) -> "_ChunkTable":
+        return cls(
+            document_ids=np.array([chunk.document_id for chunk in chunks], dtype=str),
+            chunk_ids=np.array([chunk.chunk_id for chunk in chunks], dtype=str),
+            pages=np.array([chunk.page for chunk in chunks], dtype=np.int32),
+            chunk_indices=np.array([chunk.chunk_index for chunk in chunks], dtype=np.int32),
+            low_quality=np.array(low_quality, dtype=bool),
+            texts=[chunk.text for chunk in chunks],
+        )
+    
+    @classmethod
+    def from_mapping(cls, document_map: Dict[int, Dict[str, Any]], size: int) -> "_ChunkTable":
+        """Convert the legacy {position: info} dict (document_mapping.pkl)."""
+        infos = [document_map.get(idx, {}) for idx in range(size)]
+        texts = [info.get('text', '') for info in infos]
+        return cls(
+            document_ids=np.array([info.get('document_id', 'unknown') for info in infos], dtype=str),
+            chunk_ids=np.array([info.get('chunk_id', 'unknown') for info in infos], dtype=str),
+            pages=np.array([info.get('metadata', {}).get('page', 1) for info in infos], dtype=np.int32),
+            chunk_indices=np.array([info.get('metadata', {}).get('chunk_index', idx)
+                                    for idx, info in enumerate(infos)], dtype=np.int32),
+            # Chunks indexed before the flag was stored are judged now
+            low_quality=np.array([info['is_low_quality'] if 'is_low_quality' in info else is_low_quality_chunk(text)
+                                  for info, text in zip(infos, texts)], dtype=bool),
+            texts=texts,
+        )
+    
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        files = [*cls._ARRAY_FILES.values(), cls._TEXTS_FILE]
+        return all(os.path.exists(os.path.join(directory, name)) for name in files)
+    
+    @classmethod
+    def load(cls, directory: str) -> "_ChunkTable":
+        columns = {
+            column: np.load(os.path.join(directory, name), mmap_mode='r')
+            for column, name in cls._ARRAY_FILES.items()
+        }
+        with open(os.path.join(directory, cls._TEXTS_FILE), 'r', encoding='utf-8') as f:
+            texts = json.load(f)
+        return cls(texts=texts, **columns)
+    
+    def save(self, directory: str) -> None:
+        for column, name in self._ARRAY_FILES.items():
+            values = getattr(self, column)
+            # A memory-mapped column is unchanged since load (every edit makes a
+            # new array), and rewriting a mapped file fails on Windows
+            if not isinstance(values, np.memmap):
+                _write_replacing(os.path.join(directory, name), lambda path: _save_npy(path, values))
+        
+        def write_texts(path: str) -> None:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.texts, f, ensure_ascii=False)
+        # Written last: its file identity is the store's on-disk version (see VectorStore.refresh)
+        _write_replacing(os.path.join(directory, self._TEXTS_FILE), write_texts)
+    
+    def concat(self, other: "_ChunkTable") -> "_ChunkTable":
+        return _ChunkTable(
+            texts=self.texts + other.texts,
+            **{column: np.concatenate([getattr(self, column), getattr(other, column)])
+               for column in self._ARRAY_FILES}
+        )
+    
+    def take(self, positions: np.ndarray) -> "_ChunkTable":
+        return _ChunkTable(
+            texts=[self.texts[idx] for idx in positions],
+            **{column: getattr(self, column)[positions] for column in self._ARRAY_FILES}
+        )
+    
+    def record(self, idx: int) -> Dict[str, Any]:
+        text = self.texts[idx]
+        return {
+            'document_id': str(self.document_ids[idx]),
+            'chunk_id': str(self.chunk_ids[idx]),
+            'text': text,
+            'metadata': {'page': int(self.pages[idx]), 'length': len(text),
+                         'chunk_index': int(self.chunk_indices[idx])},
+            'is_low_quality': bool(self.low_quality[idx])
+        }
+
 
 class VectorStore:
     """FAISS-based vector store for document embeddings."""
@@ -27,9 +233,32 @@ class VectorStore:
         self.config = config
         self.model = None
         self.index = None
-        self.document_map = {}  # Maps vector index to document info
+        self.chunk_table = _ChunkTable()  # Row i describes the chunk at FAISS position i
+        # One instance may be shared across request threads; guards index + table
+        self._lock = threading.RLock()
+        # Proximity cache: results of recent queries, reused for any query whose
+        # embedding is within query_cache_threshold cosine similarity (and has the
+        # same search parameters). Rows of _qcache_vecs line up with _qcache_entries.
+        self._qcache_vecs = np.empty((0, config.embedding_dimension), dtype=np.float32)
+        self._qcache_entries: List[Tuple[tuple, List[Dict[str, Any]]]] = []
+        self._qcache_used: List[int] = []
+        self._qcache_tick = 0
+        # Query text digest -> embedding; repeated queries skip the model. Guarded by _lock
+        self._embed_cache: Optional[LRUCache] = (
+            LRUCache(maxsize=config.embedding_cache_size) if config.embedding_cache_size > 0 else None
+        )
+        # Set by changes not yet written to disk (see flush())
+        self._dirty = False
+        # Vectors the int8 quantizer was last trained on (see _add_vectors)
+        self._sq_trained_on = 0
+        # Identity of the saved store this instance matches (see refresh())
+        self._disk_version: Optional[Tuple[int, int, int]] = None
         self._ensure_directory()
+        # Serializes writers across processes sharing vector_db_path (see _begin_write)
+        self._write_lock = _StoreLock(os.path.join(config.vector_db_path, ".write.lock"))
         self._load_or_create_index()
+        # Process-wide OpenMP setting; FAISS spreads batched queries and large scans over these
+        faiss.omp_set_num_threads(config.search_threads or os.cpu_count() or 1)
     
     def _ensure_directory(self) -> None:
         """Create vector store directory if it doesn't exist."""
@@ -62,45 +291,213 @@ class VectorStore:
     
     def _load_or_create_index(self) -> None:
         """Load existing FAISS index or create a new one."""
-        index_path = os.path.join(self.config.vector_db_path, "faiss_index.bin")
-        mapping_path = os.path.join(self.config.vector_db_path, "document_mapping.pkl")
+        store_path = self.config.vector_db_path
+        index_path = os.path.join(store_path, "faiss_index.bin")
+        # Stores written before the columnar chunk table kept a pickled dict
+        legacy_mapping_path = os.path.join(store_path, "document_mapping.pkl")
+        has_table = _ChunkTable.exists(store_path)
         
-        if os.path.exists(index_path) and os.path.exists(mapping_path):
+        if os.path.exists(index_path) and (has_table or os.path.exists(legacy_mapping_path)):
             try:
+                self._disk_version = self._stored_version()
                 # Load existing index
                 self.index = faiss.read_index(index_path)
                 
-                # Load document mapping
-                with open(mapping_path, 'rb') as f:
-                    self.document_map = pickle.load(f)
+                # Load chunk records
+                if has_table:
+                    self.chunk_table = _ChunkTable.load(store_path)
+                else:
+                    with open(legacy_mapping_path, 'rb') as f:
+                        document_map = pickle.load(f)
+                    self.chunk_table = _ChunkTable.from_mapping(document_map, self.index.ntotal)
+                    self._dirty = True
+                if len(self.chunk_table) != self.index.ntotal:
+                    raise ValueError(f"{len(self.chunk_table)} chunk records for {self.index.ntotal} vectors")
                 
                 logger.info(f"Loaded existing index with {self.index.ntotal} vectors")
+                self._convert_index_type()
+                self._save_migrated_table()
                 return
             except Exception as e:
                 logger.warning(f"Failed to load existing index: {str(e)}")
         
         # Create new index
-        self.index = faiss.IndexFlatIP(self.config.embedding_dimension)  # Cosine similarity
-        self.document_map = {}
-        logger.info("Created new FAISS index")
+        self.index = self._new_index()
+        self.chunk_table = _ChunkTable()
+        self._dirty = False
+        logger.info(f"Created new FAISS index ({self.config.index_type}, {self.config.vector_quantization})")
+    
+    def _new_index(self, quantization: Optional[str] = None) -> faiss.Index:
+        """Empty index of the configured type; inner product is cosine on normalized vectors.
+        
+        Without an explicit quantization an int8 store starts out fp32, until
+        _add_vectors has enough vectors to train on.
+        """
+        if quantization is None:
+            quantization = self.config.vector_quantization
+            if quantization == "int8":
+                quantization = "fp32"
+        d = self.config.embedding_dimension
+        sq_type = _SQ_TYPES.get(quantization)
+        if self.config.index_type == "hnsw":
+            if sq_type is None:
+                index = faiss.IndexHNSWFlat(d, self.config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexHNSWSQ(d, sq_type, self.config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.config.hnsw_ef_construction
+            index.hnsw.efSearch = self.config.hnsw_ef_search
+            return index
+        if sq_type is None:
+            return faiss.IndexFlatIP(d)
+        return faiss.IndexScalarQuantizer(d, sq_type, faiss.METRIC_INNER_PRODUCT)
+    
+    def _add_vectors(self, vectors: np.ndarray) -> None:
+        """Add float32 vectors to the index, (re)training an int8 quantizer when due."""
+        if self.config.vector_quantization == "int8":
+            total = self.index.ntotal + len(vectors)
+            if _index_layout(self.index)[1] != "int8":
+                due = total >= _SQ_MIN_TRAIN
+            else:
+                due = total > _SQ_RETRAIN_GROWTH * self._sq_trained_on
+            if due:
+                self._retrain_int8(vectors)
+                return
+        self.index.add(vectors)
+    
+    def _retrain_int8(self, new_vectors: np.ndarray) -> None:
+        """Rebuild the index as int8, with ranges learned from every stored vector plus new_vectors.
+        
+        Stored vectors come back through reconstruct_n: exact while the index is
+        still fp32, and already inside the old ranges otherwise, so the new
+        batch is what can widen them.
+        """
+        if self.index.ntotal:
+            vectors = np.vstack([self.index.reconstruct_n(0, self.index.ntotal), new_vectors])
+        else:
+            vectors = new_vectors
+        logger.info(f"Training int8 quantizer on {len(vectors)} vectors")
+        index = self._new_index("int8")
+        index.train(vectors)
+        index.add(vectors)
+        self.index = index
+        self._sq_trained_on = len(vectors)
+    
+    def _convert_index_type(self) -> None:
+        """Rebuild a loaded index whose type or quantization differs from the config.
+        
+        Vectors keep their positions, so chunk_table stays valid.
+        """
+        wanted = (self.config.index_type, self.config.vector_quantization)
+        layout = _index_layout(self.index)
+        # Taken as trained on what it holds; a later 4x growth retrains it
+        self._sq_trained_on = self.index.ntotal
+        if layout == wanted:
+            return
+        if wanted[1] == "int8" and layout == (wanted[0], "fp32") and self.index.ntotal < _SQ_MIN_TRAIN:
+            return  # int8 store still collecting vectors to train on
+        logger.info(f"Rebuilding {self.index.ntotal}-vector index as {'/'.join(wanted)}")
+        vectors = self.index.reconstruct_n(0, self.index.ntotal) if self.index.ntotal else None
+        self.index = self._new_index()
+        if vectors is not None:
+            self._add_vectors(vectors)
+        self._save_index()
+    
+    def _save_migrated_table(self) -> None:
+        """Write the chunk table converted from document_mapping.pkl, if any."""
+        if not self._dirty:
+            return
+        try:
+            self._save_index()
+            logger.info(f"Converted document mapping for {len(self.chunk_table)} chunks to columnar files")
+        except Exception:
+            # The table stays in memory; the next successful save persists it
+            pass
+    
+    def _stored_version(self) -> Optional[Tuple[int, int, int]]:
+        """(inode, mtime_ns, size) of the chunk texts file, which every save replaces last."""
+        try:
+            st = os.stat(os.path.join(self.config.vector_db_path, _ChunkTable._TEXTS_FILE))
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+    
+    def refresh(self) -> bool:
+        """Reload the index if another process has saved a newer one; True if it did.
+        
+        Several server workers share one vector_db_path. Each keeps its own copy
+        in memory, so call this before serving from it (one stat when nothing
+        changed). Unsaved local changes are kept; a save that is still being
+        written is picked up on a later call.
+        """
+        version = self._stored_version()
+        if version is None or version == self._disk_version:
+            return False
+        store_path = self.config.vector_db_path
+        with self._lock:
+            if self._dirty or version == self._disk_version:
+                return False
+            try:
+                index = faiss.read_index(os.path.join(store_path, "faiss_index.bin"))
+                chunk_table = _ChunkTable.load(store_path)
+                if len(chunk_table) != index.ntotal:
+                    raise ValueError(f"{len(chunk_table)} chunk records for {index.ntotal} vectors")
+            except Exception as e:
+                logger.warning(f"Vector store changed on disk but could not be reloaded yet: {e}")
+                return False
+            self.index = index
+            self.chunk_table = chunk_table
+            self._disk_version = version
+            self._index_changed()
+            self._convert_index_type()
+        logger.info(f"Reloaded vector store saved by another process ({index.ntotal} vectors)")
+        return True
+    
+    def _begin_write(self) -> None:
+        """Take the cross-process write lock and catch up with other processes' saves.
+        
+        Other worker processes share vector_db_path, so a change must be made to
+        the latest saved store and saved before anyone else writes. The lock is
+        held until the change is on disk: released by _end_write, or by flush()
+        after add_documents/remove_document with flush=False. Call under self._lock.
+        """
+        self._write_lock.acquire()
+        self.refresh()
+    
+    def _end_write(self) -> None:
+        """Release the write lock unless unsaved changes are waiting for flush()."""
+        if not self._dirty:
+            self._write_lock.release()
+    
+    def flush(self) -> None:
+        """Write pending changes (from add_documents/remove_document with flush=False) to disk."""
+        with self._lock:
+            try:
+                if self._dirty:
+                    self._save_index()
+            finally:
+                self._write_lock.release()
     
     def _save_index(self) -> None:
-        """Save FAISS index and document mapping to disk."""
+        """Save FAISS index and chunk table to disk, under the write lock."""
+        acquired = self._write_lock.acquire()
         try:
             index_path = os.path.join(self.config.vector_db_path, "faiss_index.bin")
-            mapping_path = os.path.join(self.config.vector_db_path, "document_mapping.pkl")
             
             # Save FAISS index
-            faiss.write_index(self.index, index_path)
+            _write_replacing(index_path, lambda path: faiss.write_index(self.index, path))
             
-            # Save document mapping
-            with open(mapping_path, 'wb') as f:
-                pickle.dump(self.document_map, f)
+            # Save chunk records
+            self.chunk_table.save(self.config.vector_db_path)
+            self._dirty = False
+            self._disk_version = self._stored_version()
             
             logger.info("Successfully saved vector index")
         except Exception as e:
             logger.error(f"Failed to save index: {str(e)}")
             raise
+        finally:
+            if acquired:
+                self._write_lock.release()
     
     def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for a list of texts."""
@@ -110,21 +507,14 @@ class VectorStore:
         self._load_embedding_model()
         
         try:
-            # Generate embeddings in batches
-            embeddings = []
-            batch_size = self.config.batch_size
-            
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                batch_embeddings = self.model.encode(
-                    batch,
-                    convert_to_numpy=True,
-                    normalize_embeddings=True  # For cosine similarity
-                )
-                embeddings.append(batch_embeddings)
-            
-            # Concatenate all embeddings
-            all_embeddings = np.vstack(embeddings) if embeddings else np.array([])
+            # One encode() call for the whole list: it batches internally and
+            # groups texts of similar length, so batches carry less padding
+            all_embeddings = self.model.encode(
+                texts,
+                batch_size=self.config.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True  # For cosine similarity
+            )
             logger.info(f"Generated {len(all_embeddings)} embeddings")
             
             return all_embeddings
@@ -133,16 +523,33 @@ class VectorStore:
             logger.error(f"Failed to generate embeddings: {str(e)}")
             raise
     
-    def add_documents(self, chunks: List[Dict[str, Any]]) -> None:
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embeddings for search queries, encoding only those not seen recently."""
+        if self._embed_cache is None:
+            return self.generate_embeddings(queries)
+        keys = [hashlib.blake2b(query.encode('utf-8'), digest_size=16).digest() for query in queries]
+        with self._lock:
+            cached = [self._embed_cache.get(key) for key in keys]
+        # Each distinct uncached query is encoded once, even if repeated in the batch
+        missing = {key: query for key, query, vec in zip(keys, queries, cached) if vec is None}
+        if missing:
+            fresh = self.generate_embeddings(list(missing.values()))
+            if len(fresh) != len(missing):
+                return fresh
+            fresh_by_key = dict(zip(missing, fresh))
+            with self._lock:
+                self._embed_cache.update(fresh_by_key)
+            cached = [fresh_by_key[key] if vec is None else vec for key, vec in zip(keys, cached)]
+        return np.vstack(cached)
+    
+    def add_documents(self, chunks: List[Chunk], flush: bool = True) -> None:
         """
         Add document chunks to the vector store.
         
         Args:
-            chunks: List of chunk dictionaries with keys:
-                - text: The text content
-                - document_id: Source document ID
-                - chunk_id: Unique chunk identifier
-                - metadata: Additional metadata (page, etc.)
+            chunks: Chunks from TextChunker.chunk_text
+            flush: Save the index to disk now; pass False when making several
+                changes in a row and call flush() once at the end
         """
         if not chunks:
             logger.warning("No chunks provided to add_documents")
@@ -150,7 +557,7 @@ class VectorStore:
         
         try:
             # Extract texts for embedding
-            texts = [chunk['text'] for chunk in chunks]
+            texts = [chunk.text for chunk in chunks]
             
             # Generate embeddings
             embeddings = self.generate_embeddings(texts)
@@ -159,22 +566,28 @@ class VectorStore:
                 logger.warning("No embeddings generated")
                 return
             
-            # Add to FAISS index
-            start_index = self.index.ntotal
-            self.index.add(embeddings.astype(np.float32))
-            
-            # Update document mapping
-            for i, chunk in enumerate(chunks):
-                vector_index = start_index + i
-                self.document_map[vector_index] = {
-                    'document_id': chunk['document_id'],
-                    'chunk_id': chunk['chunk_id'],
-                    'text': chunk['text'],
-                    'metadata': chunk.get('metadata', {})
-                }
+            # Chunk text never changes once indexed, so judge quality once here
+            # rather than on every query
+            low_quality = [is_low_quality_chunk(text) for text in texts]
             
-            # Save to disk
-            self._save_index()
+            with self._lock:
+                # Build on what other workers have saved, not a stale copy
+                self._begin_write()
+                try:
+                    # Add to FAISS index
+                    # encode() already returns float32; only convert other dtypes
+                    self._add_vectors(embeddings.astype(np.float32, copy=False))
+                    self._index_changed()
+                
+                    # New rows line up with the positions FAISS just assigned
+                    self.chunk_table = self.chunk_table.concat(_ChunkTable.from_chunks(chunks, low_quality))
+                
+                    # Save to disk
+                    self._dirty = True
+                    if flush:
+                        self.flush()
+                finally:
+                    self._end_write()
             
             logger.info(f"Added {len(chunks)} chunks to vector store. Total vectors: {self.index.ntotal}")
             
@@ -182,7 +595,8 @@ class VectorStore:
             logger.error(f"Failed to add documents to vector store: {str(e)}")
             raise
     
-    def search(self, query: str, k: Optional[int] = None, document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def search(self, query: str, k: Optional[int] = None, document_id: Optional[str] = None,
+               similarity_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Search for similar documents.
         
@@ -190,12 +604,15 @@ class VectorStore:
             query: Search query text
             k: Number of results to return (defaults to config.top_k_results)
             document_id: Optional document ID to limit search scope
+            similarity_threshold: Minimum score for this search (defaults to config.similarity_threshold)
         
         Returns:
             List of search results with similarity scores
         """
         if k is None:
             k = self.config.top_k_results
+        if similarity_threshold is None:
+            similarity_threshold = self.config.similarity_threshold
         
         if self.index.ntotal == 0:
             logger.warning("Vector store is empty")
@@ -203,44 +620,13 @@ class VectorStore:
         
         try:
             # Generate query embedding
-            query_embedding = self.generate_embeddings([query])
+            query_embedding = self._embed_queries([query])
             
             if len(query_embedding) == 0:
                 logger.warning("Failed to generate query embedding")
                 return []
             
-            # Search FAISS index
-            scores, indices = self.index.search(
-                query_embedding.astype(np.float32), 
-                min(k, self.index.ntotal)
-            )
-            
-            # Format results
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx == -1:  # FAISS returns -1 for invalid indices
-                    continue
-                
-                # Apply similarity threshold
-                if score < self.config.similarity_threshold:
-                    continue
-                
-                # Get document info
-                doc_info = self.document_map.get(idx, {})
-                
-                # Filter by document_id if specified
-                if document_id and doc_info.get('document_id') != document_id:
-                    continue
-                
-                result = {
-                    'score': float(score),
-                    'document_id': doc_info.get('document_id', 'unknown'),
-                    'chunk_id': doc_info.get('chunk_id', 'unknown'),
-                    'text': doc_info.get('text', ''),
-                    'metadata': doc_info.get('metadata', {})
-                }
-                results.append(result)
-            
+            results = self._search_embeddings(query_embedding, k, document_id, similarity_threshold)[0]
             logger.info(f"Found {len(results)} relevant chunks for query")
             return results
             
@@ -248,76 +634,228 @@ class VectorStore:
             logger.error(f"Search failed: {str(e)}")
             return []
     
+    def search_batch(self, queries: List[str], k: Optional[int] = None, document_id: Optional[str] = None,
+                     similarity_threshold: Optional[float] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries at once.
+        
+        All queries are embedded in one pass and looked up with a single
+        (batched) FAISS search; arguments are as for search().
+        
+        Returns:
+            One result list per query, in order
+        """
+        if not queries:
+            return []
+        if k is None:
+            k = self.config.top_k_results
+        if similarity_threshold is None:
+            similarity_threshold = self.config.similarity_threshold
+        
+        if self.index.ntotal == 0:
+            logger.warning("Vector store is empty")
+            return [[] for _ in queries]
+        
+        try:
+            query_embeddings = self._embed_queries(list(queries))
+            
+            if len(query_embeddings) != len(queries):
+                logger.warning("Failed to generate query embeddings")
+                return [[] for _ in queries]
+            
+            batch_results = self._search_embeddings(query_embeddings, k, document_id, similarity_threshold)
+            logger.info(f"Found {sum(map(len, batch_results))} relevant chunks for {len(queries)} queries")
+            return batch_results
+            
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            return [[] for _ in queries]
+    
+    def _search_embeddings(self, query_embeddings: np.ndarray, k: int, document_id: Optional[str],
+                           similarity_threshold: float) -> List[List[Dict[str, Any]]]:
+        """Results for each row of query_embeddings, from the query cache or one FAISS search."""
+        query_vecs = query_embeddings.astype(np.float32, copy=False)
+        params = (k, document_id, similarity_threshold)
+        
+        with self._lock:
+            batch_results: List[Optional[List[Dict[str, Any]]]] = [
+                self._qcache_lookup(query_vec, params) for query_vec in query_vecs
+            ]
+            misses = [row for row, results in enumerate(batch_results) if results is None]
+            if misses:
+                # HNSW can't return more hits than its search beam
+                hnsw = isinstance(self.index, faiss.IndexHNSW)
+                ef_search = max(self.config.hnsw_ef_search, k)
+                exact_positions = None
+                if document_id:
+                    positions = self._positions_of(document_id)
+                    n_hits = min(k, len(positions))
+                    if hnsw and len(positions) <= _HNSW_EXACT_SCAN_FACTOR * ef_search:
+                        # HNSW walks the whole graph and drops other documents' nodes
+                        # from its beam, so a small document loses most of its hits;
+                        # scoring its few vectors directly is exact and cheap
+                        exact_positions = positions
+                    else:
+                        # Let FAISS skip other documents' vectors. For HNSW, widen the
+                        # beam by how much of the graph the filter discards
+                        selector = faiss.IDSelectorBatch(positions)
+                        if hnsw:
+                            ef_search = min(self.index.ntotal, ef_search * self.index.ntotal // len(positions) + 1)
+                            search_params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+                        else:
+                            search_params = faiss.SearchParameters(sel=selector)
+                else:
+                    if hnsw:
+                        self.index.hnsw.efSearch = ef_search
+                    search_params = None
+                    n_hits = min(k, self.index.ntotal)
+                if not n_hits:
+                    # Unknown document: nothing to search
+                    for row in misses:
+                        batch_results[row] = []
+                    return batch_results
+                
+                if exact_positions is not None:
+                    scores = query_vecs[misses] @ self.index.reconstruct_batch(exact_positions).T
+                    order = np.argsort(-scores, axis=1, kind='stable')[:, :n_hits]
+                    scores = np.take_along_axis(scores, order, axis=1)
+                    indices = exact_positions[order]
+                else:
+                    # Search FAISS index
+                    scores, indices = self.index.search(query_vecs[misses], n_hits, params=search_params)
+                for row, row_scores, row_indices in zip(misses, scores, indices):
+                    results = self._format_hits(row_scores, row_indices, similarity_threshold)
+                    self._qcache_store(query_vecs[row], params, results)
+                    batch_results[row] = results
+        
+        return batch_results
+    
+    def _positions_of(self, document_id: str) -> np.ndarray:
+        """FAISS positions (int64) of a document's chunks. Call under the lock."""
+        return np.flatnonzero(self.chunk_table.document_ids == document_id).astype(np.int64, copy=False)
+    
+    def _format_hits(self, scores: np.ndarray, indices: np.ndarray,
+                     similarity_threshold: float) -> List[Dict[str, Any]]:
+        """Turn one row of FAISS output into search results. Call under the lock."""
+        # FAISS returns -1 for invalid indices; drop those and sub-threshold hits in one pass
+        keep = (indices != -1) & (scores >= similarity_threshold)
+        return [
+            {'score': score, **self.chunk_table.record(idx)}
+            for score, idx in zip(scores[keep].tolist(), indices[keep].tolist())
+        ]
+    
+    def _qcache_lookup(self, query_vec: np.ndarray, params: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Cached results for a near-identical earlier query, or None. Call under the lock."""
+        if not len(self._qcache_entries):
+            return None
+        sims = self._qcache_vecs @ query_vec
+        hits = np.flatnonzero(sims >= self.config.query_cache_threshold)
+        # Most similar candidate first; only a handful ever clear the threshold
+        for row in hits[np.argsort(-sims[hits])]:
+            cached_params, results = self._qcache_entries[row]
+            if cached_params == params:
+                self._qcache_tick += 1
+                self._qcache_used[row] = self._qcache_tick
+                return [dict(result) for result in results]
+        return None
+    
+    def _qcache_store(self, query_vec: np.ndarray, params: tuple, results: List[Dict[str, Any]]) -> None:
+        """Remember results for a query, evicting the least recently used entry. Call under the lock."""
+        capacity = self.config.query_cache_size
+        if capacity <= 0:
+            return
+        self._qcache_tick += 1
+        entry = (params, [dict(result) for result in results])
+        if len(self._qcache_entries) < capacity:
+            self._qcache_vecs = np.vstack([self._qcache_vecs, query_vec[None, :]])
+            self._qcache_entries.append(entry)
+            self._qcache_used.append(self._qcache_tick)
+        else:
+            row = min(range(capacity), key=self._qcache_used.__getitem__)
+            self._qcache_vecs[row] = query_vec
+            self._qcache_entries[row] = entry
+            self._qcache_used[row] = self._qcache_tick
+    
+    def _index_changed(self) -> None:
+        """Drop state derived from the index contents. Call under the lock."""
+        self._qcache_clear()
+    
+    def _qcache_clear(self) -> None:
+        """Drop cached query results; any change to the index makes them stale."""
+        self._qcache_vecs = self._qcache_vecs[:0]
+        self._qcache_entries = []
+        self._qcache_used = []
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics."""
         return {
             'total_vectors': self.index.ntotal if self.index else 0,
             'embedding_dimension': self.config.embedding_dimension,
             'model_name': self.config.embedding_model,
+            'index_type': self.config.index_type,
+            'vector_quantization': self.config.vector_quantization,
             'similarity_threshold': self.config.similarity_threshold,
-            'unique_documents': len(set(
-                info.get('document_id', '') 
-                for info in self.document_map.values()
-            )) if self.document_map else 0
+            'unique_documents': int(np.unique(self.chunk_table.document_ids).size)
         }
     
-    def remove_document(self, document_id: str) -> int:
+    def remove_document(self, document_id: str, flush: bool = True) -> int:
         """
         Remove all vectors for a specific document.
         Note: FAISS doesn't support efficient deletion, so this rebuilds the index.
+        
+        flush works as for add_documents.
         """
-        if not self.document_map:
-            return 0
+        with self._lock:
+            self._begin_write()
+            try:
+                if not len(self.chunk_table):
+                    return 0
         
-        # Find indices to keep (not belonging to the document)
-        indices_to_keep = []
-        for idx, info in self.document_map.items():
-            if info.get('document_id') != document_id:
-                indices_to_keep.append(idx)
+                keep_mask = self.chunk_table.document_ids != document_id
+                kept_count = int(keep_mask.sum())
         
-        if len(indices_to_keep) == len(self.document_map):
-            logger.info(f"Document {document_id} not found in vector store")
-            return 0
+                if kept_count == len(self.chunk_table):
+                    logger.info(f"Document {document_id} not found in vector store")
+                    return 0
         
-        removed_count = len(self.document_map) - len(indices_to_keep)
+                removed_count = len(self.chunk_table) - kept_count
+                self._index_changed()
         
-        if len(indices_to_keep) == 0:
-            # Remove all vectors
-            self.index = faiss.IndexFlatIP(self.config.embedding_dimension)
-            self.document_map = {}
-        else:
-            # Rebuild index with remaining vectors
-            logger.info(f"Rebuilding index after removing {removed_count} vectors")
-            
-            # Extract vectors and documents to keep
-            vectors_to_keep = []
-            new_document_map = {}
-            
-            for new_idx, old_idx in enumerate(indices_to_keep):
-                # Get vector from old index
-                vector = self.index.reconstruct(old_idx)
-                vectors_to_keep.append(vector)
-                
-                # Update mapping with new index
-                new_document_map[new_idx] = self.document_map[old_idx]
+                if kept_count == 0:
+                    # Remove all vectors
+                    self.index = self._new_index()
+                    self.chunk_table = _ChunkTable()
+                else:
+                    # Rebuild index with remaining vectors
+                    logger.info(f"Rebuilding index after removing {removed_count} vectors")
             
-            # Create new index
-            self.index = faiss.IndexFlatIP(self.config.embedding_dimension)
-            if vectors_to_keep:
-                vectors_array = np.vstack(vectors_to_keep)
-                self.index.add(vectors_array.astype(np.float32))
+                    # One contiguous copy of all vectors, then a single masked slice
+                    vectors_to_keep = self.index.reconstruct_n(0, self.index.ntotal)[keep_mask]
+                    self.chunk_table = self.chunk_table.take(np.flatnonzero(keep_mask))
             
-            self.document_map = new_document_map
+                    # Create new index
+                    self.index = self._new_index()
+                    self._add_vectors(vectors_to_keep)
         
-        # Save updated index
-        self._save_index()
+                # Save updated index
+                self._dirty = True
+                if flush:
+                    self.flush()
+            finally:
+                self._end_write()
         
         logger.info(f"Removed {removed_count} vectors for document {document_id}")
         return removed_count
     
     def clear(self) -> None:
         """Clear all vectors from the store."""
-        self.index = faiss.IndexFlatIP(self.config.embedding_dimension)
-        self.document_map = {}
-        self._save_index()
+        with self._lock:
+            self.index = self._new_index()
+            self.chunk_table = _ChunkTable()
+            self._index_changed()
+            try:
+                self._save_index()
+            finally:
+                # Also ends a flush=False batch, whose changes are gone now
+                self._write_lock.release()
         logger.info("Cleared all vectors from store")
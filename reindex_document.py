@@ -18,30 +18,34 @@ def reindex_document(document_id: str):
     # Remove old vectors
     print("Removing old vectors...")
     vs = VectorStore(cfg)
-    removed = vs.remove_document(document_id)
-    print(f"Removed {removed} old vectors")
+    # Removal and re-add are saved to disk together, once
+    try:
+        removed = vs.remove_document(document_id, flush=False)
+        print(f"Removed {removed} old vectors")
     
-    # Load processed text
-    processed_path = os.path.join(cfg.processed_folder, f"{document_id}.txt")
-    if not os.path.exists(processed_path):
-        print(f"Error: Processed file not found: {processed_path}")
-        return False
+        # Load processed text
+        processed_path = os.path.join(cfg.processed_folder, f"{document_id}.txt")
+        if not os.path.exists(processed_path):
+            print(f"Error: Processed file not found: {processed_path}")
+            return False
     
-    print(f"Loading text from: {processed_path}")
-    with open(processed_path, "r", encoding="utf-8", errors="ignore") as f:
-        text = f.read()
+        print(f"Loading text from: {processed_path}")
+        with open(processed_path, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read()
     
-    print(f"Text length: {len(text)} characters")
+        print(f"Text length: {len(text)} characters")
     
-    # Chunk text
-    print("Chunking text...")
-    chunker = TextChunker(cfg)
-    chunks = chunker.chunk_text(text, document_id)
-    print(f"Created {len(chunks)} chunks")
+        # Chunk text
+        print("Chunking text...")
+        chunker = TextChunker(cfg)
+        chunks = chunker.chunk_text(text, document_id)
+        print(f"Created {len(chunks)} chunks")
     
-    # Add to vector store (filter will be applied during retrieval)
-    print("Adding chunks to vector store...")
-    vs.add_documents(chunks)
+        # Add to vector store (filter will be applied during retrieval)
+        print("Adding chunks to vector store...")
+        vs.add_documents(chunks, flush=False)
+    finally:
+        vs.flush()
     
     stats = vs.get_stats()
     print(f"\nDone! Vector store now has {stats['total_vectors']} total vectors")
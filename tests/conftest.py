@@ -1,17 +1,107 @@
 import os
 import io
-import sys
+import atexit
+import hashlib
+import shutil
+import tempfile
+from types import SimpleNamespace
+import numpy as np
 import pytest
 
 # Ensure test mode
 os.environ.setdefault("DEBUG", "false")
+# The suite uploads more than a client may per minute in production
+os.environ.setdefault("RATE_LIMIT_UPLOAD_PER_MIN", "1000")
 
-# Guarantee the backend directory (parent of tests) is on sys.path so `import app` works
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if BASE_DIR not in sys.path:
-    sys.path.insert(0, BASE_DIR)
+# Keep uploads, metadata and the vector index out of the working tree: each run
+# (and each pytest-xdist worker, which imports this file itself) gets fresh
+# directories (read by RAGConfig.from_env), removed when it exits
+_TMP_ROOT = tempfile.mkdtemp(prefix=f"rag-tests-{os.getenv('PYTEST_XDIST_WORKER', 'main')}-")
+atexit.register(shutil.rmtree, _TMP_ROOT, ignore_errors=True)
+for env_name, sub_dir in (
+    ("UPLOAD_FOLDER", "raw"),
+    ("PROCESSED_FOLDER", "processed"),
+    ("METADATA_FOLDER", "metadata"),
+    ("VECTOR_DB_PATH", "vector_store"),
+):
+    os.environ[env_name] = os.path.join(_TMP_ROOT, sub_dir)
 
 from app import app  # noqa: E402
+from rag import response_generator  # noqa: E402
+from rag.vector_store import VectorStore  # noqa: E402
+
+STUB_ANSWER = "Stubbed answer."
+
+
+class _StubGeminiModel:
+    """Stands in for genai.GenerativeModel; returns STUB_ANSWER without a network call."""
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        resp = SimpleNamespace(text=STUB_ANSWER)
+        return [resp] if stream else resp
+
+
+class _StubOpenAICompletions:
+    """Stands in for client.chat.completions, in both plain and streaming form."""
+
+    def create(self, stream=False, **kwargs):
+        usage = SimpleNamespace(total_tokens=1)
+        if stream:
+            delta = SimpleNamespace(delta=SimpleNamespace(content=STUB_ANSWER))
+            return [SimpleNamespace(choices=[delta], usage=None), SimpleNamespace(choices=[], usage=usage)]
+        message = SimpleNamespace(message=SimpleNamespace(content=STUB_ANSWER))
+        return SimpleNamespace(choices=[message], usage=usage)
+
+
+@pytest.fixture(autouse=True)
+def stub_llm(request, monkeypatch):
+    """Route Gemini/OpenAI calls to local stubs, so no test depends on the network or API keys.
+
+    Without a configured key the app still falls back to rule-based answers;
+    tests marked ``integration`` get the real clients.
+    """
+    if request.node.get_closest_marker("integration"):
+        return
+    monkeypatch.setattr(response_generator, "GEMINI_AVAILABLE", True)
+    monkeypatch.setattr(response_generator, "OPENAI_AVAILABLE", True)
+    monkeypatch.setattr(response_generator, "_gemini_model", lambda api_key, model_name: _StubGeminiModel())
+    monkeypatch.setattr(
+        response_generator, "_openai_client",
+        lambda api_key, timeout, max_retries: SimpleNamespace(chat=SimpleNamespace(completions=_StubOpenAICompletions()))
+    )
+
+@pytest.fixture(scope="session", autouse=True)
+def cached_embeddings(request):
+    """Keep embeddings in pytest's cache (.pytest_cache) so later runs skip the model.
+
+    Keyed by model name and text, so a different EMBEDDING_MODEL is encoded afresh.
+    Without the cache plugin (-p no:cacheprovider) every text is encoded as usual.
+    """
+    cache = getattr(request.config, "cache", None)
+    if cache is None:
+        yield
+        return
+    encode = VectorStore.generate_embeddings
+
+    def generate_embeddings(self, texts):
+        if not texts:
+            return encode(self, texts)
+        keys = [
+            f"rag/embeddings/{self.config.embedding_model}/"
+            + hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+            for text in texts
+        ]
+        vectors = [cache.get(key, None) for key in keys]
+        missing = [row for row, vec in enumerate(vectors) if vec is None]
+        if missing:
+            for row, vec in zip(missing, encode(self, [texts[row] for row in missing])):
+                vectors[row] = vec.tolist()
+                cache.set(keys[row], vectors[row])
+        return np.array(vectors, dtype=np.float32)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(VectorStore, "generate_embeddings", generate_embeddings)
+        yield
 
 @pytest.fixture(scope="session")
 def client():
@@ -19,6 +109,28 @@ def client():
     with app.test_client() as c:
         yield c
 
+# Contents of the documents uploaded once per session (see uploaded_docs)
+SHARED_DOCS = {
+    "doc1": b"This is the first document about quantum physics.",
+    "doc2": b"This is a completely different document about Python programming and web development.",
+}
+
+@pytest.fixture(scope="session")
+def uploaded_docs(client):
+    """SHARED_DOCS uploaded and indexed once per session, as {'doc1': id, 'doc2': id}."""
+    docs = {}
+    for name, content in SHARED_DOCS.items():
+        resp = client.post("/upload", data={"file": (io.BytesIO(content), f"{name}.txt")},
+                           content_type="multipart/form-data")
+        assert resp.status_code == 201, resp.get_json()
+        docs[name] = resp.get_json()["document_id"]
+    return docs
+
+SAMPLE_TEXT = b"Sample content about backend testing and retrieval."
+
 @pytest.fixture
-def sample_text_file():
-    return (io.BytesIO(b"Sample content about backend testing and retrieval."), "test_doc.txt")
+def make_sample_text_file():
+    """Factory for (file, name) upload pairs; each call wraps SAMPLE_TEXT in a fresh, unread buffer."""
+    def make(name="test_doc.txt", content=SAMPLE_TEXT):
+        return (io.BytesIO(content), name)
+    return make
@@ -1,64 +1,30 @@
 """
 Test active document functionality.
+
+Uses the session-scoped ``client`` fixture from conftest.py.
 """
-import os
-import sys
 import pytest
-from io import BytesIO
-
-# Add parent directory to path so we can import app
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-
-from app import app as flask_app
 
 
-@pytest.fixture
-def client():
-    """Create a test client for the Flask app."""
-    flask_app.config["TESTING"] = True
-    with flask_app.test_client() as client:
-        yield client
+@pytest.fixture(autouse=True)
+def clear_active_document(client):
+    """The active document is shared by every test in the session; reset it after each."""
+    yield
+    client.post("/active-document", json={"document_id": None})
 
 
-def test_active_document_workflow(client):
+def test_active_document_workflow(client, uploaded_docs):
     """
-    Test the complete active document workflow:
-    1. Upload two documents
-    2. Set one as active
+    Test the complete active document workflow (documents from uploaded_docs):
+    1. Set one as active
+    2. Get active document (should return the set document)
     3. Ask question without document_id (should use active)
-    4. Get active document (should return the set document)
-    5. Clear active document
-    6. Get active document (should return null)
+    4. Clear active document
+    5. Get active document (should return null)
     """
-    # 1. Upload first document
-    doc1_content = b"This is the first document about quantum physics."
-    doc1_data = {
-        "file": (BytesIO(doc1_content), "doc1.txt")
-    }
-    response1 = client.post(
-        "/upload",
-        data=doc1_data,
-        content_type="multipart/form-data"
-    )
-    assert response1.status_code == 200
-    doc1_id = response1.get_json().get("document_id")
-    assert doc1_id is not None
-
-    # 2. Upload second document
-    doc2_content = b"This is the second document about machine learning."
-    doc2_data = {
-        "file": (BytesIO(doc2_content), "doc2.txt")
-    }
-    response2 = client.post(
-        "/upload",
-        data=doc2_data,
-        content_type="multipart/form-data"
-    )
-    assert response2.status_code == 200
-    doc2_id = response2.get_json().get("document_id")
-    assert doc2_id is not None
+    doc1_id = uploaded_docs["doc1"]
 
-    # 3. Set doc1 as active
+    # 1. Set doc1 as active
     set_active_response = client.post(
         "/active-document",
         json={"document_id": doc1_id}
@@ -68,13 +34,13 @@ def test_active_document_workflow(client):
     assert set_active_json["message"] == "Active document set"
     assert set_active_json["document_id"] == doc1_id
 
-    # 4. Get active document (should be doc1)
+    # 2. Get active document (should be doc1)
     get_active_response = client.get("/active-document")
     assert get_active_response.status_code == 200
     active_doc = get_active_response.get_json().get("document_id")
     assert active_doc == doc1_id
 
-    # 5. Ask question without document_id (should auto-use doc1)
+    # 3. Ask question without document_id (should auto-use doc1)
     ask_response = client.post(
         "/ask",
         json={"question": "What is this document about?"}
@@ -90,7 +56,7 @@ def test_active_document_workflow(client):
                 assert source["document_id"] == doc1_id, \
                     f"Expected doc1 ({doc1_id}), got {source['document_id']}"
 
-    # 6. Clear active document
+    # 4. Clear active document
     clear_response = client.post(
         "/active-document",
         json={"document_id": None}
@@ -99,7 +65,7 @@ def test_active_document_workflow(client):
     clear_json = clear_response.get_json()
     assert clear_json["message"] == "Active document cleared"
 
-    # 7. Get active document (should be null)
+    # 5. Get active document (should be null)
     get_cleared_response = client.get("/active-document")
     assert get_cleared_response.status_code == 200
     cleared_active = get_cleared_response.get_json().get("document_id")
@@ -116,25 +82,17 @@ def test_set_active_document_without_json(client):
     assert "application/json" in response.get_json().get("error", "")
 
 
-def test_active_document_override(client):
+def test_active_document_override(client, uploaded_docs):
     """
     Test that explicit document_id in /ask overrides active document.
     """
-    # 1. Upload two documents
-    doc1_content = b"Document one content."
-    doc1_data = {"file": (BytesIO(doc1_content), "doc1.txt")}
-    response1 = client.post("/upload", data=doc1_data, content_type="multipart/form-data")
-    doc1_id = response1.get_json().get("document_id")
-
-    doc2_content = b"Document two content."
-    doc2_data = {"file": (BytesIO(doc2_content), "doc2.txt")}
-    response2 = client.post("/upload", data=doc2_data, content_type="multipart/form-data")
-    doc2_id = response2.get_json().get("document_id")
-
-    # 2. Set doc1 as active
+    doc1_id = uploaded_docs["doc1"]
+    doc2_id = uploaded_docs["doc2"]
+
+    # 1. Set doc1 as active
     client.post("/active-document", json={"document_id": doc1_id})
 
-    # 3. Ask with explicit doc2_id (should override active doc1)
+    # 2. Ask with explicit doc2_id (should override active doc1)
     ask_response = client.post(
         "/ask",
         json={"question": "What is this about?", "document_id": doc2_id}
@@ -0,0 +1,71 @@
+import json
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+from rag import response_generator
+from rag.response_generator import ResponseGenerator
+from conftest import STUB_ANSWER
+
+
+@pytest.fixture
+def openai_responder(monkeypatch):
+    """Swap the app's responder for one on the (stubbed) OpenAI client; see stub_llm."""
+    cfg = replace(app_module._get_cfg(), llm_provider="openai", openai_api_key="test-key")
+    monkeypatch.setitem(app_module._RAG, "responder", ResponseGenerator(cfg))
+
+
+def _events(resp):
+    """Parse an SSE body into [(event name or None, data dict)]."""
+    events = []
+    for block in resp.get_data(as_text=True).split("\n\n"):
+        if not block:
+            continue
+        name, data = None, None
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((name, data))
+    return events
+
+
+def _ask_stream(client, uploaded_docs, question):
+    resp = client.post("/ask", json={"question": question, "document_id": uploaded_docs["doc1"], "stream": True})
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    return _events(resp)
+
+
+def test_ask_stream_sends_deltas_then_done(client, uploaded_docs, openai_responder):
+    events = _ask_stream(client, uploaded_docs, "What is the first document about, in streaming form?")
+    deltas = [data["delta"] for name, data in events[:-1]]
+    assert all(name is None for name, _ in events[:-1])
+    assert deltas and deltas[0] == STUB_ANSWER
+
+    name, done = events[-1]
+    assert name == "done" and done["done"] is True
+    assert done["sources"] and done["sources"][0]["document_id"] == uploaded_docs["doc1"]
+    assert "first_token_ms" in done["meta"]
+
+
+def test_ask_stream_falls_back_when_llm_fails_before_any_text(client, uploaded_docs, monkeypatch):
+    def failing_client(api_key, timeout, max_retries):
+        def create(**kwargs):
+            raise RuntimeError("upstream unavailable")
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    monkeypatch.setattr(response_generator, "_openai_client", failing_client)
+    cfg = replace(app_module._get_cfg(), llm_provider="openai", openai_api_key="test-key")
+    monkeypatch.setitem(app_module._RAG, "responder", ResponseGenerator(cfg))
+
+    events = _ask_stream(client, uploaded_docs, "What is the first document about, when the LLM is down?")
+    assert len(events) == 2
+    (_, fallback), (name, done) = events
+    assert fallback["delta"] and fallback["delta"] != STUB_ANSWER
+    assert name == "done"
+    assert done["sources"]
+    assert done["meta"]["first_token_ms"] == done["meta"]["generation_time_ms"]
@@ -5,3 +5,11 @@ def test_ask_stub_before_upload(client):
     assert 'answer' in data
     assert 'sources' in data and isinstance(data['sources'], list)
     assert 'meta' in data
+
+
+def test_ask_small_talk_skips_rag(client):
+    resp = client.post('/ask', json={'question': 'Thanks so much!'})
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['meta']['model'] == 'stub-fast'
+    assert data['sources'] == []
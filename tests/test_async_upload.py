@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def async_upload(monkeypatch):
+    monkeypatch.setattr(app_module, "UPLOAD_ASYNC", True)
+
+
+def _upload(client, make_sample_text_file, content):
+    resp = client.post("/upload", data={"file": make_sample_text_file("async.txt", content)},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 202, resp.get_json()
+    body = resp.get_json()
+    assert body["status"] == "indexing"
+    return body["document_id"]
+
+
+def _wait_for_status(client, doc_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        docs = {d["document_id"]: d for d in client.get("/documents").get_json()["documents"]}
+        if docs[doc_id]["status"] != "indexing" or time.monotonic() > deadline:
+            return docs[doc_id]
+        time.sleep(0.02)
+
+
+def test_async_upload_indexes_in_background(client, async_upload, make_sample_text_file):
+    doc_id = _upload(client, make_sample_text_file, b"Background indexing of photosynthesis notes.")
+    doc = _wait_for_status(client, doc_id)
+    assert doc["status"] == "processed"
+    assert doc["chunk_count"] >= 1
+    assert doc_id in set(app_module._get_vs().chunk_table.document_ids)
+    client.delete(f"/documents/{doc_id}")
+
+
+def test_async_upload_failure_is_persisted(client, async_upload, make_sample_text_file, monkeypatch):
+    def fail(doc_id):
+        raise RuntimeError("embedding backend down")
+
+    monkeypatch.setattr(app_module, "_index_document", fail)
+    doc_id = _upload(client, make_sample_text_file, b"Notes whose indexing fails.")
+    doc = _wait_for_status(client, doc_id)
+    assert doc["status"] == "failed"
+    assert doc["error"] == "embedding backend down"
+    # Stored in the metadata db too, not only in this process's job table
+    assert app_module._get_processor().get_document_metadata(doc_id).status == "failed"
+    client.delete(f"/documents/{doc_id}")
+
+
+def test_delete_during_background_indexing_leaves_no_vectors(client, async_upload, make_sample_text_file,
+                                                            monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    index_document = app_module._index_document
+
+    def slow_index(doc_id):
+        started.set()
+        release.wait(10)
+        return index_document(doc_id)
+
+    monkeypatch.setattr(app_module, "_index_document", slow_index)
+    doc_id = _upload(client, make_sample_text_file, b"Notes deleted while still being embedded.")
+    assert started.wait(10)
+
+    responses = []
+    deleter = threading.Thread(
+        target=lambda: responses.append(app_module.app.test_client().delete(f"/documents/{doc_id}"))
+    )
+    deleter.start()
+    time.sleep(0.1)  # let the DELETE reach the document lock
+    release.set()
+    deleter.join(10)
+
+    assert responses and responses[0].status_code == 200
+    assert responses[0].get_json()["vectors_removed"] >= 1
+    assert doc_id not in set(app_module._get_vs().chunk_table.document_ids)
+    assert doc_id not in {d["document_id"] for d in client.get("/documents").get_json()["documents"]}
@@ -0,0 +1,93 @@
+"""ETag / If-None-Match handling on the read endpoints, plus Range on ?raw=1."""
+import pytest
+
+import app as app_module
+
+
+def _assert_not_modified(client, url, etag):
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.get_data() == b""
+    assert resp.headers["ETag"] == etag
+
+
+@pytest.fixture
+def extra_doc(client, make_sample_text_file):
+    """Upload one more document; yields a function that deletes it (once)."""
+    resp = client.post("/upload", data={"file": make_sample_text_file("etag.txt", b"Cache validators for etag tests.")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 201, resp.get_json()
+    doc_id = resp.get_json()["document_id"]
+    deleted = []
+
+    def delete():
+        if not deleted:
+            assert client.delete(f"/documents/{doc_id}").status_code == 200
+            deleted.append(doc_id)
+
+    yield doc_id, delete
+    delete()
+
+
+@pytest.mark.parametrize("url", ["/documents", "/rag/stats"])
+def test_listing_and_stats_revalidate(client, uploaded_docs, make_sample_text_file, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    _assert_not_modified(client, url, etag)
+
+    # Upload: the body changes, so the old tag no longer matches
+    resp = client.post("/upload", data={"file": make_sample_text_file("etag-list.txt", b"Another doc for revalidation.")},
+                       content_type="multipart/form-data")
+    doc_id = resp.get_json()["document_id"]
+    after_upload = client.get(url, headers={"If-None-Match": etag})
+    assert after_upload.status_code == 200
+    assert after_upload.headers["ETag"] != etag
+    _assert_not_modified(client, url, after_upload.headers["ETag"])
+
+    # Delete: changes again
+    client.delete(f"/documents/{doc_id}")
+    after_delete = client.get(url, headers={"If-None-Match": after_upload.headers["ETag"]})
+    assert after_delete.status_code == 200
+    assert after_delete.headers["ETag"] != after_upload.headers["ETag"]
+
+
+def test_document_content_revalidates(client, extra_doc):
+    doc_id, delete = extra_doc
+    url = f"/documents/{doc_id}/content"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    _assert_not_modified(client, url, etag)
+    # max_length is part of the representation
+    assert client.get(f"{url}?max_length=10", headers={"If-None-Match": etag}).status_code == 200
+
+    # Re-indexing updates the metadata in the body
+    app_module._get_processor().update_metadata(doc_id, chunk_count=99)
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["metadata"]["chunk_count"] == 99
+
+    delete()
+    assert client.get(url, headers={"If-None-Match": changed.headers["ETag"]}).status_code == 404
+
+
+def test_raw_content_supports_conditional_and_range(client, extra_doc):
+    doc_id, delete = extra_doc
+    url = f"/documents/{doc_id}/content?raw=1"
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.mimetype == "text/plain"
+    body = first.get_data()
+    assert body.startswith(b"Cache validators")
+    etag = first.headers["ETag"]
+    _assert_not_modified(client, url, etag)
+
+    partial = client.get(url, headers={"Range": "bytes=6-15"})
+    assert partial.status_code == 206
+    assert partial.get_data() == body[6:16]
+    assert partial.headers["Content-Range"] == f"bytes 6-15/{len(body)}"
+
+    delete()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 404
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+
+import app as app_module
+
+
+def _other_worker_update(sql, params):
+    """Commit through a separate connection, as another server process would."""
+    db_path = os.path.join(os.environ["METADATA_FOLDER"], "documents.db")
+    with sqlite3.connect(db_path) as db:
+        db.execute(sql, params)
+
+
+def test_listing_sees_changes_from_other_workers(client, uploaded_docs):
+    doc_id = uploaded_docs["doc1"]
+    first = client.get("/documents")
+    assert first.status_code == 200
+
+    _other_worker_update("UPDATE documents SET filename = ? WHERE document_id = ?", ("renamed.txt", doc_id))
+    try:
+        resp = client.get("/documents", headers={"If-None-Match": first.headers["ETag"]})
+        assert resp.status_code == 200
+        names = {d["document_id"]: d["filename"] for d in resp.get_json()["documents"]}
+        assert names[doc_id] == "renamed.txt"
+        assert resp.headers["ETag"] != first.headers["ETag"]
+    finally:
+        _other_worker_update("UPDATE documents SET filename = ? WHERE document_id = ?", ("doc1.txt", doc_id))
+
+
+def test_processed_index_sees_files_from_other_workers(uploaded_docs):
+    processed_dir = os.environ["PROCESSED_FOLDER"]
+    assert uploaded_docs["doc1"] in app_module._processed_files(processed_dir)
+
+    path = os.path.join(processed_dir, "from-other-worker.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("written elsewhere")
+    try:
+        assert "from-other-worker" in app_module._processed_files(processed_dir)
+    finally:
+        os.remove(path)
+    assert "from-other-worker" not in app_module._processed_files(processed_dir)
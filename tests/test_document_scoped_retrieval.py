@@ -1,22 +1,6 @@
-import io
-
-
-def test_document_scoped_retrieval(client, sample_text_file):
+def test_document_scoped_retrieval(client, uploaded_docs):
     """Test that document_id parameter limits retrieval to specified document."""
-    
-    # Upload first document
-    file_content1, filename1 = sample_text_file
-    data1 = {'file': (file_content1, 'doc1.txt')}
-    resp1 = client.post('/upload', data=data1, content_type='multipart/form-data')
-    assert resp1.status_code == 201
-    doc1_id = resp1.get_json()['document_id']
-    
-    # Upload second document with different content
-    file_content2 = io.BytesIO(b"This is a completely different document about Python programming and web development.")
-    data2 = {'file': (file_content2, 'doc2.txt')}
-    resp2 = client.post('/upload', data=data2, content_type='multipart/form-data')
-    assert resp2.status_code == 201
-    doc2_id = resp2.get_json()['document_id']
+    doc1_id = uploaded_docs['doc1']
     
     # Query with document_id filter for first document
     ask_resp = client.post('/ask', json={
@@ -1,3 +1,7 @@
+import io
+import os
+
+
 def test_ask_missing_json(client):
     # Missing JSON body -> still JSON required, but sending form will trigger 415
     resp = client.post('/ask', data='question=Hi')
@@ -18,3 +22,13 @@ def test_delete_unknown_document(client):
     resp = client.delete('/documents/does_not_exist')
     # Could be 404 (preferred) or 200 with message. We accept 404 as spec.
     assert resp.status_code in (200, 404)
+
+
+def test_upload_rejects_content_not_matching_extension(client):
+    folders = [os.environ['UPLOAD_FOLDER'], os.environ['PROCESSED_FOLDER']]
+    before = [sorted(os.listdir(folder)) for folder in folders]
+    resp = client.post('/upload', data={'file': (io.BytesIO(b"hello"), 'x.pdf')},
+                       content_type='multipart/form-data')
+    assert resp.status_code == 400
+    # Nothing kept from the rejected upload, not even the temporary part file
+    assert [sorted(os.listdir(folder)) for folder in folders] == before
@@ -0,0 +1,35 @@
+import dataclasses
+import os
+
+import pytest
+
+from rag import response_generator
+from rag.config import RAGConfig
+from rag.response_generator import ResponseGenerator
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(os.getenv("RUN_INTEGRATION_TESTS") != "1",
+                       reason="set RUN_INTEGRATION_TESTS=1 to call the live LLM provider"),
+]
+
+
+def test_live_llm_answer():
+    """One real round trip to the configured provider (needs its library and API key)."""
+    # No response cache: never answer from an earlier (possibly stubbed) response
+    cfg = dataclasses.replace(RAGConfig.from_env(), llm_cache_size=0)
+    provider = (cfg.llm_provider or "openai").lower()
+    if provider == "gemini":
+        if not (response_generator.GEMINI_AVAILABLE and cfg.gemini_api_key):
+            pytest.skip("google-generativeai or GEMINI_API_KEY not available")
+    elif not (response_generator.OPENAI_AVAILABLE and cfg.openai_api_key):
+        pytest.skip("openai or OPENAI_API_KEY not available")
+
+    generator = ResponseGenerator(cfg)
+    result = generator.generate_response(
+        "What color is the sky on a clear day?",
+        "On a clear day the sky is blue.",
+        [],
+    )
+    assert result["meta"]["model"] not in ("fallback", "error")
+    assert result["answer"].strip()
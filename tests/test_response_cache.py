@@ -0,0 +1,56 @@
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+
+from rag import response_generator
+from rag.config import RAGConfig
+from rag.response_generator import ResponseGenerator
+
+SOURCES = [{"document_id": "doc", "chunk_id": "c0", "page_number": 1, "score": 0.9}]
+
+
+class _RecordingGeminiModel:
+    """Gemini stand-in that records its calls and returns the queued answers in turn."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls.append(kwargs)
+        resp = SimpleNamespace(text=self.answers.pop(0))
+        return [resp] if stream else resp
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Build a temperature-0, caching Gemini responder around a _RecordingGeminiModel."""
+    def make(*answers):
+        model = _RecordingGeminiModel(answers)
+        monkeypatch.setattr(response_generator, "_gemini_model", lambda api_key, model_name: model)
+        cfg = replace(RAGConfig(), llm_provider="gemini", gemini_api_key="test-key", temperature=0.0,
+                      max_tokens=321, llm_cache_size=8)
+        return ResponseGenerator(cfg), model
+    return make
+
+
+def test_gemini_calls_use_configured_sampling(gemini):
+    responder, model = gemini("Plain answer.", "Streamed answer.")
+    responder.generate_response("Which sampling settings reach Gemini?", "Some context.", SOURCES)
+    list(responder.stream_response("Which sampling settings reach streamed Gemini?", "Some context.", SOURCES))
+    assert [call["generation_config"] for call in model.calls] == [
+        {"temperature": 0.0, "max_output_tokens": 321},
+    ] * 2
+
+
+def test_empty_answers_are_not_cached(gemini):
+    responder, model = gemini("", "Second try answer.")
+    question = "Is an empty Gemini answer replayed from the cache?"
+    responder.generate_response(question, "Some context.", SOURCES)
+    second = responder.generate_response(question, "Some context.", SOURCES)
+    assert len(model.calls) == 2
+    assert second["answer"].startswith("Second try answer.")
+    # Non-empty answers still are
+    third = responder.generate_response(question, "Some context.", SOURCES)
+    assert len(model.calls) == 2 and third["meta"]["cached"] is True
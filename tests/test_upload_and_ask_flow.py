@@ -1,8 +1,9 @@
 import io
+import os
 
 
-def test_upload_then_ask_flow(client, sample_text_file):
-    file_content, filename = sample_text_file
+def test_upload_then_ask_flow(client, make_sample_text_file):
+    file_content, filename = make_sample_text_file()
     data = {
         'file': (file_content, filename)
     }
@@ -25,3 +26,27 @@ def test_upload_then_ask_flow(client, sample_text_file):
     ask_json = ask_resp.get_json()
     assert 'answer' in ask_json
     assert isinstance(ask_json.get('sources'), list)
+
+
+def test_identical_uploads_share_extracted_text(client, make_sample_text_file):
+    content = b"Identical uploads reuse the text extracted from the first copy."
+    ids = []
+    for name in ("copy1.txt", "copy2.txt"):
+        resp = client.post('/upload', data={'file': make_sample_text_file(name, content)},
+                           content_type='multipart/form-data')
+        assert resp.status_code == 201
+        ids.append(resp.get_json()['document_id'])
+
+    processed = [os.path.join(os.environ['PROCESSED_FOLDER'], f"{doc_id}.txt") for doc_id in ids]
+    first, second = (os.stat(path) for path in processed)
+    assert (first.st_dev, first.st_ino) == (second.st_dev, second.st_ino)  # hard-linked, not re-extracted
+    lengths = {d['document_id']: d['text_length'] for d in client.get('/documents').get_json()['documents']}
+    assert lengths[ids[0]] == lengths[ids[1]] > 0
+
+    # Each copy owns its own name: deleting one leaves the other readable
+    assert client.delete(f"/documents/{ids[0]}").status_code == 200
+    assert not os.path.exists(processed[0])
+    resp = client.get(f"/documents/{ids[1]}/content")
+    assert resp.status_code == 200
+    assert resp.get_json()['content'] == content.decode()
+    client.delete(f"/documents/{ids[1]}")
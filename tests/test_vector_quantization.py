@@ -0,0 +1,33 @@
+import faiss
+import numpy as np
+
+from rag.chunking import Chunk
+from rag.config import RAGConfig
+from rag.vector_store import VectorStore
+
+
+def _unit_vectors(rng, n, d):
+    vecs = rng.standard_normal((n, d)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_int8_recall_matches_flat_after_small_first_upload(tmp_path, monkeypatch):
+    """A one-chunk first upload must not fix the int8 ranges used for everything after it."""
+    d, k = 384, 10
+    rng = np.random.default_rng(0)
+    data = _unit_vectors(rng, 2001, d)
+    queries = _unit_vectors(rng, 50, d)
+
+    cfg = RAGConfig(vector_db_path=str(tmp_path), embedding_dimension=d, vector_quantization="int8")
+    store = VectorStore(cfg)
+    batches = iter([data[:1], data[1:]])
+    monkeypatch.setattr(store, "generate_embeddings", lambda texts: next(batches))
+    store.add_documents([Chunk("first", "doc0", "c0", 1, 0)], flush=False)
+    store.add_documents([Chunk(f"chunk {i}", "doc1", f"c{i}", 1, i) for i in range(1, len(data))], flush=False)
+
+    _, found = store.index.search(queries, k)
+    exact = np.argsort(-(queries @ data.T), axis=1)[:, :k]
+    recall = np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)])
+    assert isinstance(store.index, faiss.IndexScalarQuantizer)  # trained and converted, not still fp32
+    assert store.index.ntotal == len(data)
+    assert recall >= 0.9
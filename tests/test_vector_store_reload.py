@@ -0,0 +1,85 @@
+import threading
+import time
+
+import numpy as np
+
+from rag.chunking import Chunk
+from rag.config import RAGConfig
+from rag.vector_store import VectorStore, _StoreLock
+
+
+def _store(path, monkeypatch, d=8):
+    store = VectorStore(RAGConfig(vector_db_path=str(path), embedding_dimension=d))
+    rng = np.random.default_rng(len(str(path)))
+
+    def embed(texts):
+        vecs = rng.standard_normal((len(texts), d)).astype(np.float32)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+    monkeypatch.setattr(store, "generate_embeddings", embed)
+    return store
+
+
+def test_store_picks_up_changes_saved_by_another_worker(tmp_path, monkeypatch):
+    """Two VectorStores on one directory stand in for two server workers."""
+    writer = _store(tmp_path, monkeypatch)
+    reader = _store(tmp_path, monkeypatch)
+    assert not reader.refresh()
+
+    writer.add_documents([Chunk("alpha", "doc1", "c0", 1, 0), Chunk("beta", "doc1", "c1", 1, 1)])
+    assert reader.refresh()
+    assert reader.index.ntotal == 2
+    assert set(reader.chunk_table.document_ids) == {"doc1"}
+    assert not reader.refresh()  # nothing new since
+
+    # A write from the reader builds on the writer's chunks rather than replacing them
+    reader.add_documents([Chunk("gamma", "doc2", "c0", 1, 0)])
+    assert writer.refresh()
+    assert sorted(writer.chunk_table.document_ids) == ["doc1", "doc1", "doc2"]
+
+    writer.remove_document("doc1")
+    reader.refresh()
+    assert list(reader.chunk_table.document_ids) == ["doc2"]
+    assert reader.index.ntotal == 1
+
+
+def test_concurrent_writers_keep_each_others_chunks(tmp_path, monkeypatch):
+    """A save from one worker can't overwrite chunks another worker added in the meantime."""
+    first = _store(tmp_path, monkeypatch)
+    second = _store(tmp_path, monkeypatch)
+    in_add, release = threading.Event(), threading.Event()
+    add_vectors = first._add_vectors
+
+    def slow_add_vectors(vectors):
+        in_add.set()
+        release.wait(10)
+        add_vectors(vectors)
+
+    monkeypatch.setattr(first, "_add_vectors", slow_add_vectors)
+    writer = threading.Thread(target=first.add_documents, args=([Chunk("alpha", "doc1", "c0", 1, 0)],))
+    writer.start()
+    assert in_add.wait(10)
+    other = threading.Thread(target=second.add_documents, args=([Chunk("beta", "doc2", "c0", 1, 0)],))
+    other.start()
+    time.sleep(0.1)  # second is now waiting for the write lock
+    release.set()
+    writer.join(10)
+    other.join(10)
+
+    reloaded = _store(tmp_path, monkeypatch)
+    assert sorted(reloaded.chunk_table.document_ids) == ["doc1", "doc2"]
+    assert reloaded.index.ntotal == 2
+
+
+def test_write_lock_is_held_until_flush(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch)
+    store.add_documents([Chunk("alpha", "doc1", "c0", 1, 0)], flush=False)
+    other = _StoreLock(str(tmp_path / ".write.lock"))
+    acquired = threading.Thread(target=other.acquire)
+    acquired.start()
+    acquired.join(0.2)
+    assert acquired.is_alive()  # blocked behind the unflushed batch
+    store.flush()
+    acquired.join(10)
+    assert not acquired.is_alive()
+    other.release()
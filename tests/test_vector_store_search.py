@@ -0,0 +1,31 @@
+import numpy as np
+
+from rag.chunking import Chunk
+from rag.config import RAGConfig
+from rag.vector_store import VectorStore
+
+
+def _unit_vectors(rng, n, d):
+    vecs = rng.standard_normal((n, d)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_hnsw_document_scope_returns_all_chunks_of_a_small_document(tmp_path, monkeypatch):
+    """The filtered graph walk alone finds ~1 of 5 chunks of a small document in a 20k index."""
+    d, doc_chunks = 64, 5
+    rng = np.random.default_rng(1)
+    data = _unit_vectors(rng, 20000 + doc_chunks, d)
+
+    cfg = RAGConfig(vector_db_path=str(tmp_path), embedding_dimension=d, index_type="hnsw")
+    store = VectorStore(cfg)
+    batches = iter([data[:-doc_chunks], data[-doc_chunks:]])
+    monkeypatch.setattr(store, "generate_embeddings", lambda texts: next(batches))
+    store.add_documents([Chunk(f"other {i}", "big", f"c{i}", 1, i) for i in range(len(data) - doc_chunks)],
+                        flush=False)
+    store.add_documents([Chunk(f"small {i}", "small", f"c{i}", 1, i) for i in range(doc_chunks)], flush=False)
+
+    queries = _unit_vectors(rng, 20, d)
+    for results in store._search_embeddings(queries, doc_chunks, "small", -1.0):
+        assert sorted(hit["chunk_id"] for hit in results) == [f"c{i}" for i in range(doc_chunks)]
+        scores = [hit["score"] for hit in results]
+        assert scores == sorted(scores, reverse=True)